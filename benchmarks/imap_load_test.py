@@ -0,0 +1,85 @@
+"""
+Measures EmailReader.fetch_emails_since throughput against the local IMAP replay server.
+
+    python -m benchmarks.imap_load_test --count 10000 --body-chars 20000
+    python -m benchmarks.imap_load_test --mailbox /tmp/mailbox --latency FETCH=5
+
+Without --mailbox a synthetic mailbox is generated into a temp directory first.
+"""
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from utils import metrics
+from core.email_reader import EmailReader
+from benchmarks.imap_replay import IMAPReplayServer, parse_latency_overrides, load_mailbox
+from benchmarks.make_mailbox import generate_mailbox
+from benchmarks.pipeline_benchmark import summarize_records
+
+
+def run_load_test(mailbox_dir, allowed_senders, since_days, latency_ms=0.0, command_latency_ms=None):
+    """Fetches from the replay server once and returns (result dict, metric records)."""
+    run = metrics.start_run("imap_load_test", metrics_dir=None)
+    with IMAPReplayServer(mailbox_dir, latency_ms=latency_ms, command_latency_ms=command_latency_ms) as server:
+        reader = EmailReader("load@example.com", "password", server=server.host, port=server.port, use_ssl=False)
+        start = time.perf_counter()
+        if not reader.connect(): raise RuntimeError("Could not connect to the replay server")
+        emails = reader.fetch_emails_since(allowed_senders, target_date=date.today() - timedelta(days=since_days))
+        reader.disconnect()
+        elapsed = time.perf_counter() - start
+        result = {"mailbox_messages": len(server.messages), "fetched_relevant": len(emails), "seconds": round(elapsed, 3),
+                  "commands": dict(server.command_counts), "mb_served": round(server.bytes_served / 1e6, 2)}
+    metrics.end_run(log_summary=False)
+    result["messages_per_s"] = round(result["commands"].get("FETCH", 0) / elapsed, 1) if elapsed else None
+    result["mb_per_s"] = round(result["mb_served"] / elapsed, 2) if elapsed else None
+    return result, run.records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test EmailReader against a local IMAP replay server.")
+    parser.add_argument("--mailbox", help="Existing mailbox directory (from make_mailbox). Generated if omitted.")
+    parser.add_argument("--count", type=int, default=10000, help="Messages to generate when --mailbox is not given.")
+    parser.add_argument("--days", type=int, default=30, help="Date spread of generated messages.")
+    parser.add_argument("--allowed-ratio", type=float, default=0.2)
+    parser.add_argument("--body-chars", type=int, default=20000, help="Truncate generated HTML bodies (0 = full size).")
+    parser.add_argument("--since-days", type=int, default=30, help="fetch_emails_since target date = today - N days.")
+    parser.add_argument("--allowed-senders", help="JSON list; defaults to the corpus newsletter senders.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every IMAP response.")
+    parser.add_argument("--latency", action="append", metavar="CMD=MS", help="Per-command delay, e.g. FETCH=5 (repeatable).")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s [%(module)s:%(lineno)d] - %(message)s')
+
+    temp_dir = None
+    mailbox_dir = args.mailbox
+    allowed_senders = json.loads(args.allowed_senders) if args.allowed_senders else None
+    try:
+        if not mailbox_dir:
+            temp_dir = mailbox_dir = tempfile.mkdtemp(prefix="imap_replay_")
+            start = time.perf_counter()
+            corpus_senders = generate_mailbox(mailbox_dir, args.count, args.days, args.allowed_ratio, args.body_chars)
+            print(f"Generated {args.count} messages in {time.perf_counter() - start:.1f}s")
+            allowed_senders = allowed_senders or corpus_senders
+        if not allowed_senders:
+            messages, _ = load_mailbox(mailbox_dir)
+            allowed_senders = sorted({m.sender for m in messages if not m.sender.startswith("sender")})
+
+        result, records = run_load_test(mailbox_dir, allowed_senders, args.since_days,
+                                        args.latency_ms, parse_latency_overrides(args.latency))
+        print(json.dumps(result, indent=2))
+        print(f"{'stage':<14}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, r in summarize_records(records).items():
+            print(f"{stage:<14}{r['count']:>8}{r['p50'] * 1000:>10.2f}{r['p90'] * 1000:>10.2f}{r['p99'] * 1000:>10.2f}{r['max'] * 1000:>10.2f}")
+    finally:
+        if temp_dir: shutil.rmtree(temp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Local IMAP4 stand-in that serves a directory of .eml files (one mailbox, INBOX).
+
+Supports the subset EmailReader and typical tuning experiments need:
+CAPABILITY, LOGIN, SELECT/EXAMINE (EXISTS, UIDVALIDITY, UIDNEXT), SEARCH and
+UID SEARCH (ALL, SINCE, BEFORE, ON, FROM, SUBJECT, UID, OR, NOT), FETCH and
+UID FETCH (RFC822, BODY[]/BODY.PEEK[], BODY.PEEK[HEADER], RFC822.SIZE,
+RFC822.HEADER, UID, FLAGS, INTERNALDATE), NOOP, CLOSE, LOGOUT.
+Plain TCP only (connect with EmailReader(..., use_ssl=False)).
+
+    python -m benchmarks.imap_replay mailbox_dir --port 1143 --latency-ms 5 --latency FETCH=20
+"""
+import argparse
+import email
+import email.parser
+import email.utils
+import json
+import logging
+import os
+import re
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+INDEX_FILENAME = "index.json"
+_TOKEN_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"|(\()|(\))|([^\s()]+)')
+_HEADER_END_RE = re.compile(rb"\r?\n\r?\n")
+_FETCH_ITEM_RE = re.compile(r'BODY(?:\.PEEK)?\[[^\]]*\](?:<[\d.]+>)?|[A-Z0-9.]+', re.I)
+
+
+class MailboxMessage:
+    """One message of the replay mailbox. The body is read from disk on demand."""
+    __slots__ = ("uid", "path", "date", "sender", "subject", "size")
+
+    def __init__(self, uid, path, date, sender, subject, size):
+        self.uid = uid; self.path = path; self.date = date
+        self.sender = sender; self.subject = subject; self.size = size
+
+    def read(self):
+        with open(self.path, 'rb') as f: return f.read()
+
+
+def load_mailbox(mailbox_dir):
+    """Loads message metadata from index.json if present, otherwise by parsing .eml headers.
+
+    Returns (messages sorted by uid, uidvalidity).
+    """
+    index_path = os.path.join(mailbox_dir, INDEX_FILENAME)
+    messages = []
+    uidvalidity = 1
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f: index = json.load(f)
+        uidvalidity = index.get("uidvalidity", 1)
+        for entry in index["messages"]:
+            path = os.path.join(mailbox_dir, entry["file"])
+            messages.append(MailboxMessage(entry["uid"], path, datetime.strptime(entry["date"], "%Y-%m-%d").date(),
+                                           entry["from"].lower(), entry.get("subject", ""), entry.get("size") or os.path.getsize(path)))
+    else:
+        parser = email.parser.BytesHeaderParser()
+        for uid, filename in enumerate(sorted(f for f in os.listdir(mailbox_dir) if f.endswith(".eml")), start=1):
+            path = os.path.join(mailbox_dir, filename)
+            with open(path, 'rb') as f: headers = parser.parse(f)
+            try: msg_date = email.utils.parsedate_to_datetime(headers.get("Date")).date()
+            except (TypeError, ValueError): msg_date = datetime.fromtimestamp(os.path.getmtime(path)).date()
+            messages.append(MailboxMessage(uid, path, msg_date, email.utils.parseaddr(headers.get("From", ""))[1].lower(),
+                                           str(headers.get("Subject", "")), os.path.getsize(path)))
+    messages.sort(key=lambda m: m.uid)
+    return messages, uidvalidity
+
+
+def _parse_imap_date(value):
+    return datetime.strptime(value, "%d-%b-%Y").date()
+
+
+def _parse_sequence_set(spec, max_value):
+    """Parses an IMAP sequence set like '1,3:5,10:*' into a set of ints."""
+    values = set()
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":", 1)
+            lo = max_value if lo == "*" else int(lo); hi = max_value if hi == "*" else int(hi)
+            if lo > hi: lo, hi = hi, lo
+            values.update(range(lo, hi + 1))
+        else:
+            values.add(max_value if part == "*" else int(part))
+    return values
+
+
+def _tokenize(data):
+    """Splits an IMAP command argument string into tokens (quoted strings unquoted, parens kept)."""
+    tokens = []
+    for quoted, open_paren, close_paren, atom in _TOKEN_RE.findall(data):
+        if open_paren: tokens.append("(")
+        elif close_paren: tokens.append(")")
+        elif atom: tokens.append(atom.decode('utf-8', errors='replace'))
+        else: tokens.append(quoted.decode('utf-8', errors='replace').replace('\\"', '"'))
+    return tokens
+
+
+def _parse_search_key(tokens, max_uid):
+    """Consumes one search key from tokens and returns a predicate(message, seqno)."""
+    key = tokens.pop(0).upper()
+    if key == "(":
+        predicates = []
+        while tokens and tokens[0] != ")": predicates.append(_parse_search_key(tokens, max_uid))
+        if tokens: tokens.pop(0)
+        return lambda m, n: all(p(m, n) for p in predicates)
+    if key == "ALL": return lambda m, n: True
+    if key == "OR":
+        left = _parse_search_key(tokens, max_uid); right = _parse_search_key(tokens, max_uid)
+        return lambda m, n: left(m, n) or right(m, n)
+    if key == "NOT":
+        inner = _parse_search_key(tokens, max_uid)
+        return lambda m, n: not inner(m, n)
+    if key in ("SINCE", "SENTSINCE"):
+        day = _parse_imap_date(tokens.pop(0)); return lambda m, n: m.date >= day
+    if key in ("BEFORE", "SENTBEFORE"):
+        day = _parse_imap_date(tokens.pop(0)); return lambda m, n: m.date < day
+    if key in ("ON", "SENTON"):
+        day = _parse_imap_date(tokens.pop(0)); return lambda m, n: m.date == day
+    if key == "FROM":
+        needle = tokens.pop(0).lower(); return lambda m, n: needle in m.sender
+    if key == "SUBJECT":
+        needle = tokens.pop(0).lower(); return lambda m, n: needle in m.subject.lower()
+    if key == "UID":
+        uids = _parse_sequence_set(tokens.pop(0), max_uid); return lambda m, n: m.uid in uids
+    if key in ("SEEN", "UNSEEN", "NEW", "RECENT", "OLD", "UNDELETED", "UNFLAGGED", "UNANSWERED"):
+        return lambda m, n: True # No flag state is kept; everything matches
+    if key[0].isdigit() or key[0] == "*":
+        seqnos = _parse_sequence_set(key, max_uid); return lambda m, n: n in seqnos
+    raise ValueError(f"Unsupported search key {key}")
+
+
+class _IMAPReplayHandler(socketserver.StreamRequestHandler):
+    """Serves one IMAP client connection."""
+    # Responses are buffered and flushed once per command; with Nagle on, the split
+    # writes of a FETCH response would stall on delayed ACKs (~40 ms per message).
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def _send(self, data):
+        self.wfile.write(data if isinstance(data, bytes) else data.encode('utf-8'))
+
+    def _untagged(self, line): self._send(f"* {line}\r\n")
+
+    def handle(self):
+        server = self.server
+        self.selected = False
+        self._untagged("OK [CAPABILITY IMAP4rev1 AUTH=PLAIN] Replay IMAP server ready")
+        self.wfile.flush()
+        while True:
+            line = self.rfile.readline()
+            if not line: break
+            line = line.rstrip(b"\r\n")
+            # Commands with literals ({n}) are completed inline: LOGIN is the only one expected
+            while line.endswith(b"}") and b"{" in line:
+                size = int(line[line.rindex(b"{") + 1:-1].rstrip(b"+"))
+                if not line.endswith(b"+}"): self._send("+ Ready\r\n"); self.wfile.flush()
+                line = line[:line.rindex(b"{")] + b'"' + self.rfile.read(size) + b'"' + self.rfile.readline().rstrip(b"\r\n")
+            parts = line.split(b" ", 2)
+            if len(parts) < 2: self._send(b"* BAD Missing command\r\n"); self.wfile.flush(); continue
+            tag = parts[0].decode('ascii', errors='replace')
+            command = parts[1].decode('ascii', errors='replace').upper()
+            args = parts[2] if len(parts) > 2 else b""
+            uid_mode = False
+            if command == "UID":
+                sub = args.split(b" ", 1)
+                command = sub[0].decode('ascii', errors='replace').upper(); args = sub[1] if len(sub) > 1 else b""
+                uid_mode = True
+            server.simulate_latency(command)
+            server.count_command(command)
+            try:
+                keep_open = self._dispatch(tag, command, args, uid_mode)
+            except Exception as e:
+                logging.warning(f"IMAP replay: error handling '{command}': {e}")
+                self._send(f"{tag} BAD {command} failed: {e}\r\n"); keep_open = True
+            self.wfile.flush()
+            if not keep_open: break
+
+    def _dispatch(self, tag, command, args, uid_mode):
+        server = self.server
+        if command == "CAPABILITY":
+            self._untagged("CAPABILITY IMAP4rev1 AUTH=PLAIN"); self._send(f"{tag} OK CAPABILITY completed\r\n")
+        elif command in ("LOGIN", "AUTHENTICATE"):
+            self._send(f"{tag} OK [CAPABILITY IMAP4rev1] Logged in\r\n")
+        elif command in ("SELECT", "EXAMINE"):
+            self.selected = True
+            messages = server.messages
+            self._untagged("FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)")
+            self._untagged(f"{len(messages)} EXISTS")
+            self._untagged("0 RECENT")
+            self._untagged(f"OK [UIDVALIDITY {server.uidvalidity}] UIDs valid")
+            self._untagged(f"OK [UIDNEXT {(messages[-1].uid if messages else 0) + 1}] Predicted next UID")
+            self._send(f"{tag} OK [{'READ-ONLY' if command == 'EXAMINE' else 'READ-WRITE'}] {command} completed\r\n")
+        elif command == "SEARCH":
+            if not self.selected: self._send(f"{tag} NO No mailbox selected\r\n"); return True
+            tokens = _tokenize(args)
+            if tokens and tokens[0].upper() == "CHARSET": tokens = tokens[2:]
+            max_uid = server.messages[-1].uid if server.messages else 0
+            predicates = []
+            while tokens: predicates.append(_parse_search_key(tokens, max_uid if uid_mode else len(server.messages)))
+            hits = [str(m.uid if uid_mode else n) for n, m in enumerate(server.messages, start=1)
+                    if all(p(m, n) for p in predicates)]
+            self._untagged("SEARCH" + ("" if not hits else " " + " ".join(hits)))
+            self._send(f"{tag} OK SEARCH completed\r\n")
+        elif command == "FETCH":
+            if not self.selected: self._send(f"{tag} NO No mailbox selected\r\n"); return True
+            spec, _, items = args.decode('utf-8', errors='replace').partition(" ")
+            self._fetch(spec, items, uid_mode)
+            self._send(f"{tag} OK FETCH completed\r\n")
+        elif command in ("NOOP", "CHECK"):
+            self._send(f"{tag} OK {command} completed\r\n")
+        elif command == "CLOSE":
+            self.selected = False; self._send(f"{tag} OK CLOSE completed\r\n")
+        elif command == "LOGOUT":
+            self._untagged("BYE Replay server logging out"); self._send(f"{tag} OK LOGOUT completed\r\n")
+            return False
+        else:
+            self._send(f"{tag} BAD Unsupported command {command}\r\n")
+        return True
+
+    def _fetch(self, spec, items, uid_mode):
+        server = self.server
+        messages = server.messages
+        items = [i.upper() for i in _FETCH_ITEM_RE.findall(items.strip("()"))]
+        if uid_mode:
+            wanted = _parse_sequence_set(spec, messages[-1].uid if messages else 0)
+            targets = [(n, m) for n, m in enumerate(messages, start=1) if m.uid in wanted]
+            if "UID" not in items: items.insert(0, "UID")
+        else:
+            wanted = _parse_sequence_set(spec, len(messages))
+            targets = [(n, messages[n - 1]) for n in sorted(wanted) if 1 <= n <= len(messages)]
+        for seqno, message in targets:
+            fields = []; literals = []
+            raw = None
+            for item in items:
+                if item == "UID": fields.append(f"UID {message.uid}")
+                elif item == "FLAGS": fields.append("FLAGS (\\Seen)")
+                elif item == "RFC822.SIZE": fields.append(f"RFC822.SIZE {message.size}")
+                elif item == "INTERNALDATE":
+                    fields.append(f'INTERNALDATE "{message.date.strftime("%d-%b-%Y")} 00:00:00 +0000"')
+                elif item in ("RFC822", "BODY[]", "BODY.PEEK[]") or item.startswith(("RFC822.HEADER", "BODY[HEADER", "BODY.PEEK[HEADER")):
+                    raw = raw if raw is not None else message.read()
+                    header_only = "HEADER" in item
+                    payload = _HEADER_END_RE.split(raw, 1)[0] + b"\r\n\r\n" if header_only else raw
+                    name = "RFC822" if item == "RFC822" else ("RFC822.HEADER" if item == "RFC822.HEADER" else item.replace(".PEEK", ""))
+                    literals.append((name, payload))
+            server.count_bytes(sum(len(p) for _, p in literals))
+            head = f"* {seqno} FETCH (" + " ".join(fields)
+            if not literals:
+                self._send(head + ")\r\n"); continue
+            for index, (name, payload) in enumerate(literals):
+                sep = " " if (fields or index) else ""
+                self._send(f"{head if index == 0 else ''}{sep}{name} {{{len(payload)}}}\r\n".encode('utf-8') + payload)
+            self._send(")\r\n")
+
+
+class IMAPReplayServer(socketserver.ThreadingTCPServer):
+    """Serves a directory of .eml files over plain IMAP on localhost.
+
+    Args:
+        mailbox_dir (str): Directory with .eml files (and optionally index.json from make_mailbox).
+        latency_ms (float): Delay added before every command response.
+        command_latency_ms (dict): Per-command delay overrides, e.g. {"FETCH": 20}.
+    Use as a context manager; the OS picks the port unless one is given.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, mailbox_dir, host="127.0.0.1", port=0, latency_ms=0.0, command_latency_ms=None):
+        self.messages, self.uidvalidity = load_mailbox(mailbox_dir)
+        self.latency_ms = latency_ms
+        self.command_latency_ms = {k.upper(): v for k, v in (command_latency_ms or {}).items()}
+        self.command_counts = {}
+        self.bytes_served = 0
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        super().__init__((host, port), _IMAPReplayHandler)
+        self.host, self.port = self.server_address
+        logging.info(f"IMAP replay server loaded {len(self.messages)} messages from {mailbox_dir}")
+
+    def simulate_latency(self, command):
+        delay = self.command_latency_ms.get(command, self.latency_ms)
+        if delay: time.sleep(delay / 1000)
+
+    def count_command(self, command):
+        with self._stats_lock: self.command_counts[command] = self.command_counts.get(command, 0) + 1
+
+    def count_bytes(self, n):
+        with self._stats_lock: self.bytes_served += n
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"IMAP replay server listening on {self.host}:{self.port}")
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        return False
+
+
+def parse_latency_overrides(values):
+    """Parses ["FETCH=20", "SEARCH=100"] into {"FETCH": 20.0, "SEARCH": 100.0}."""
+    overrides = {}
+    for value in values or []:
+        command, _, ms = value.partition("=")
+        overrides[command.upper()] = float(ms)
+    return overrides
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a directory of .eml files over IMAP for load testing.")
+    parser.add_argument("mailbox_dir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every response.")
+    parser.add_argument("--latency", action="append", metavar="CMD=MS", help="Per-command delay, e.g. FETCH=20 (repeatable).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s - %(message)s')
+    with IMAPReplayServer(args.mailbox_dir, args.host, args.port, args.latency_ms, parse_latency_overrides(args.latency)) as server:
+        try:
+            while True: time.sleep(3600)
+        except KeyboardInterrupt:
+            logging.info(f"Commands served: {server.command_counts}, bytes: {server.bytes_served}")
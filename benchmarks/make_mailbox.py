@@ -0,0 +1,87 @@
+"""
+Synthesizes a large .eml mailbox from the stored newsletter transcripts.
+
+    python -m benchmarks.make_mailbox /tmp/mailbox --count 10000 --days 30 --allowed-ratio 0.2
+
+Messages from the transcripts' own senders are the "allowed" newsletters; the
+rest come from generated noise senders so EmailReader's sender filter has
+realistic work to do. An index.json is written for fast loading by imap_replay.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+
+from benchmarks.stubs import load_transcript_corpus, DEFAULT_CORPUS_DIR
+from benchmarks.imap_replay import INDEX_FILENAME
+
+NOISE_DOMAINS = ["example.com", "shop.example.net", "notifications.example.org", "news.example.io"]
+
+
+def build_message(uid, template, sender, sent_at, body_chars=0):
+    """Builds a multipart/alternative newsletter message from a corpus template."""
+    html_body = template["body"]
+    if body_chars and len(html_body) > body_chars:
+        html_body = html_body[:body_chars] + "</div></body></html>"
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "reader@example.com"
+    msg["Subject"] = f"{template['subject']} #{uid}"
+    msg["Date"] = format_datetime(sent_at)
+    msg["Message-ID"] = make_msgid(idstring=str(uid), domain="replay.local")
+    msg.set_content("This newsletter is best viewed in HTML.")
+    msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+def generate_mailbox(out_dir, count, days=30, allowed_ratio=0.2, body_chars=0, corpus_dir=DEFAULT_CORPUS_DIR, seed=42, uidvalidity=None):
+    """Writes `count` .eml files plus index.json into out_dir. Returns the list of allowed senders."""
+    rng = random.Random(seed)
+    templates = load_transcript_corpus(corpus_dir)
+    if not templates: raise ValueError(f"No transcripts found in {corpus_dir}")
+    allowed_senders = sorted({t["from"] for t in templates})
+    noise_senders = [f"sender{i}@{NOISE_DOMAINS[i % len(NOISE_DOMAINS)]}" for i in range(200)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    now = datetime.now().astimezone()
+    # Spread messages evenly over the window, oldest first, so UIDs grow with date like a real inbox
+    step = timedelta(days=days) / max(count, 1)
+    index = {"uidvalidity": uidvalidity or int(now.timestamp()), "messages": []}
+    for uid in range(1, count + 1):
+        sent_at = now - timedelta(days=days) + step * uid
+        template = templates[rng.randrange(len(templates))]
+        sender = template["from"] if rng.random() < allowed_ratio else rng.choice(noise_senders)
+        msg = build_message(uid, template, sender, sent_at, body_chars)
+        filename = f"{uid:07d}.eml"
+        data = msg.as_bytes(policy=policy.SMTP) # CRLF line endings, as served over IMAP
+        with open(os.path.join(out_dir, filename), 'wb') as f: f.write(data)
+        index["messages"].append({"uid": uid, "file": filename, "date": sent_at.strftime("%Y-%m-%d"),
+                                  "from": sender, "subject": msg["Subject"], "size": len(data)})
+    with open(os.path.join(out_dir, INDEX_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    return allowed_senders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic mailbox of .eml files from the transcript corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30, help="Spread message dates over this many days before now.")
+    parser.add_argument("--allowed-ratio", type=float, default=0.2, help="Fraction of messages from allowed (newsletter) senders.")
+    parser.add_argument("--body-chars", type=int, default=0, help="Truncate HTML bodies to this many chars (0 = full size).")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    allowed = generate_mailbox(args.out_dir, args.count, args.days, args.allowed_ratio, args.body_chars, args.corpus, args.seed)
+    print(f"Wrote {args.count} messages to {args.out_dir}")
+    print(f"Allowed senders: {json.dumps(allowed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Offline benchmark: replays the stored newsletter corpus through the pipeline.
+
+    python -m benchmarks.pipeline_benchmark                       # stub LLM / TTS, local SMTP sink
+    python -m benchmarks.pipeline_benchmark --model tiny.gguf     # real llama.cpp model
+    python -m benchmarks.pipeline_benchmark --save-baseline       # record benchmarks/baseline.json
+    python -m benchmarks.pipeline_benchmark --compare             # exit 1 if a stage regressed
+
+Per-stage timings come from the same spans the workflow writes (utils.metrics).
+"""
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from utils import metrics
+from utils.helpers import DEFAULT_PROMPT_TOKEN_BUDGET
+from llm.local_llm import LocalLLM
+from core.content_processor import ContentProcessor
+from core.audio_generator import AudioGenerator
+from core.output_manager import OutputManager
+from benchmarks.stubs import StubLlama, StubTTS, LocalSMTPSink, load_transcript_corpus, DEFAULT_CORPUS_DIR
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (pct in 0-100)."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize_records(records):
+    """Builds {stage: {count, p50, p90, p99, max, chars_per_s, tokens_per_s}} from metric records."""
+    by_stage = {}
+    for rec in records: by_stage.setdefault(rec["stage"], []).append(rec)
+    results = {}
+    for stage, recs in by_stage.items():
+        seconds = [r["seconds"] for r in recs]
+        total = sum(seconds)
+        chars = sum(r.get("chars", 0) or 0 for r in recs)
+        tokens = sum(r.get("tokens", 0) or 0 for r in recs)
+        results[stage] = {
+            "count": len(recs),
+            "p50": percentile(seconds, 50), "p90": percentile(seconds, 90),
+            "p99": percentile(seconds, 99), "max": max(seconds),
+            "chars_per_s": round(chars / total, 1) if total and chars else None,
+            "tokens_per_s": round(tokens / total, 1) if total and tokens else None,
+        }
+    return results
+
+
+def run_benchmark(emails, llm, tts_factory, iterations=1, char_length=1000, prompt_tokens=0):
+    """Runs clean -> summarize -> TTS per email, then Excel + SMTP once per iteration."""
+    run = metrics.start_run("benchmark", metrics_dir=None)
+    work_dir = tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    content_processor = ContentProcessor(llm, prompt_token_budget=prompt_tokens)
+    audio_generator = AudioGenerator(tts_factory=tts_factory)
+    files_to_cleanup = []
+    with LocalSMTPSink() as smtp_sink:
+        output_manager = OutputManager("bench@example.com", "password", "digest@example.com", work_dir,
+                                       smtp_host=smtp_sink.host, smtp_port=smtp_sink.port, smtp_use_ssl=False)
+        for iteration in range(iterations):
+            processed = []; mp3_paths = []
+            for index, email_data in enumerate(emails, start=1):
+                metrics.set_context(iteration=iteration, email=index)
+                start = time.perf_counter()
+                cleaned, summary = content_processor.clean_and_summarize_email_body(email_data["body"], char_length)
+                if summary and not summary.startswith("Error:"):
+                    base = f"bench_{index}_" + re.sub(r'[^a-zA-Z0-9_-]', '_', email_data["subject"])[:40]
+                    mp3_path = audio_generator.text_to_speech(summary, base, f"iter{iteration}")
+                    if mp3_path: mp3_paths.append(mp3_path)
+                metrics.record("email_total", time.perf_counter() - start, chars=len(cleaned or ""))
+                processed.append({"sender": email_data["from"], "summary": summary, "cleaned_content": cleaned})
+            metrics.set_context(iteration=iteration)
+            excel_path = output_manager.create_excel(processed, "benchmark", f"iter{iteration}")
+            attachments = ([excel_path] if excel_path else []) + mp3_paths
+            output_manager.send_email(f"Benchmark digest {iteration}", "Benchmark run.", attachments)
+            files_to_cleanup.extend(attachments)
+    output_manager.cleanup_files(files_to_cleanup)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    metrics.end_run(log_summary=False)
+    return run.records
+
+
+def compare_to_baseline(results, baseline, tolerance, min_delta_s=0.002):
+    """Returns a list of (stage, baseline_p50, current_p50, ratio) for stages slower than tolerance allows.
+
+    Slowdowns smaller than min_delta_s are ignored so sub-millisecond stages do not flap.
+    """
+    regressions = []
+    for stage, base in baseline.get("stages", {}).items():
+        current = results.get(stage)
+        if not current or not base.get("p50"): continue
+        ratio = current["p50"] / base["p50"]
+        if ratio > 1 + tolerance and current["p50"] - base["p50"] > min_delta_s: regressions.append((stage, base["p50"], current["p50"], ratio))
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print(f"{'stage':<14}{'count':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'chars/s':>13}{'tok/s':>13}{'vs base':>9}")
+    for stage, r in results.items():
+        base_p50 = (baseline or {}).get("stages", {}).get(stage, {}).get("p50")
+        delta = f"{r['p50'] / base_p50:>8.2f}x" if base_p50 else f"{'-':>9}"
+        print(f"{stage:<14}{r['count']:>6}{r['p50'] * 1000:>10.2f}{r['p90'] * 1000:>10.2f}{r['p99'] * 1000:>10.2f}"
+              f"{r['max'] * 1000:>10.2f}{r['chars_per_s'] or '-':>13}{r['tokens_per_s'] or '-':>13}{delta}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored newsletters through the pipeline and report per-stage latency.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR, help="Directory of saved transcripts (default: email_transcripts/).")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--char-length", type=int, default=1000, help="Characters of cleaned text sent to the LLM.")
+    parser.add_argument("--prompt-tokens", type=int, default=DEFAULT_PROMPT_TOKEN_BUDGET,
+                        help="Token budget for extractive prompt compression (0 = cut at --char-length).")
+    parser.add_argument("--model", help="GGUF model to use instead of the stub LLM (e.g. a tiny model).")
+    parser.add_argument("--stub-prompt-ms", type=float, default=0.0, help="Simulated prompt-eval cost per token for the stub LLM.")
+    parser.add_argument("--stub-gen-ms", type=float, default=0.0, help="Simulated generation cost per token for the stub LLM.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline.")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 if any stage p50 regressed beyond --tolerance.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs baseline (0.25 = 25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore p50 slowdowns smaller than this.")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logging and debug prints.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s [%(module)s:%(lineno)d] - %(message)s')
+
+    emails = load_transcript_corpus(args.corpus)
+    if not emails: print(f"No transcripts found in {args.corpus}"); return 1
+    print(f"Corpus: {len(emails)} emails, {sum(len(e['body']) for e in emails)} HTML chars, {args.iterations} iteration(s)")
+
+    llm = LocalLLM(args.model) if args.model else LocalLLM(None, backend=StubLlama(args.stub_prompt_ms, args.stub_gen_ms))
+    if not llm.llm: print(f"Could not load model {args.model}"); return 1
+
+    # ContentProcessor / LocalLLM print prompts and summaries; keep benchmark output readable
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with quiet:
+        records = run_benchmark(emails, llm, tts_factory=StubTTS, iterations=args.iterations, char_length=args.char_length,
+                                prompt_tokens=args.prompt_tokens)
+    results = summarize_records(records)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "model": args.model or "stub",
+                       "iterations": args.iterations, "stages": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not baseline: print(f"No baseline at {args.baseline}; run with --save-baseline first."); return 1
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+        for stage, base_p50, cur_p50, ratio in regressions:
+            print(f"REGRESSION {stage}: p50 {base_p50 * 1000:.2f} ms -> {cur_p50 * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions: return 1
+        print(f"No stage regressed more than {args.tolerance:.0%} vs baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import logging
+import os
+from html import escape
+import re
+import socketserver
+import threading
+import time
+
+# --- Stand-ins for the external services used by the pipeline ---
+# These let the benchmarks run without a GGUF model, network TTS or Gmail SMTP.
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "email_transcripts")
+
+
+class StubLlama:
+    """Mimics the parts of llama_cpp.Llama used by LocalLLM (tokenize + streaming call).
+
+    Cost is simulated per token so that prompt size and output length still
+    affect the measured prompt_eval / generation times.
+    """
+
+    def __init__(self, prompt_ms_per_token=0.0, gen_ms_per_token=0.0, summary_words=120):
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.gen_ms_per_token = gen_ms_per_token
+        self.summary_words = summary_words
+
+    def tokenize(self, text_bytes, add_bos=True, special=False):
+        # Roughly matches real tokenizers for English: ~1 token per word piece / punctuation mark
+        return re.findall(rb"\w+|[^\w\s]", text_bytes)
+
+    def __call__(self, prompt, max_tokens=256, stop=None, echo=False, temperature=0.7, stream=False, **kwargs):
+        if stream: return self._stream(prompt, max_tokens)
+        text = "".join(chunk["choices"][0]["text"] for chunk in self._stream(prompt, max_tokens))
+        return {"choices": [{"text": text}]}
+
+    def _stream(self, prompt, max_tokens):
+        if self.prompt_ms_per_token:
+            time.sleep(len(self.tokenize(prompt.encode('utf-8'))) * self.prompt_ms_per_token / 1000)
+        # "Summary" = leading words of the email text inside the prompt
+        body = prompt.split("\n\n", 1)[-1].replace("[/INST]", "")
+        items = re.split(r"^\[\[(\d+)\]\]$", body, flags=re.MULTILINE)
+        if len(items) > 1: # Packed prompt: answer each [[n]] item under its own marker
+            per_item = max(1, min(self.summary_words, max_tokens // ((len(items) - 1) // 2)))
+            words = []
+            for marker, text in zip(items[1::2], items[2::2]): words += [f"\n[[{marker}]]\n"] + text.split()[:per_item]
+        else:
+            words = body.split()[:min(self.summary_words, max_tokens)]
+        for word in words:
+            if self.gen_ms_per_token: time.sleep(self.gen_ms_per_token / 1000)
+            yield {"choices": [{"text": word + " "}]}
+
+
+class StubTTS:
+    """Mimics gTTS: writes a small fake MP3 sized proportionally to the text."""
+
+    def __init__(self, text, lang='en', slow=False):
+        self.text = text
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(b"ID3" + b"\0" * (len(self.text) // 4))
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts AUTH and any message, stores nothing but sizes."""
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode('ascii'))
+
+    def handle(self):
+        self._reply("220 localhost benchmark SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line: break
+            command = line.decode('ascii', errors='replace').strip().upper()
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif command.startswith("AUTH"):
+                self._reply("235 2.7.0 Authentication successful")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"): break
+                    size += len(data_line)
+                self.server.messages.append(size)
+                self._reply("250 OK: queued")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye"); break
+            elif command.split(" ", 1)[0] in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            else:
+                self._reply("502 Command not implemented")
+
+
+class LocalSMTPSink:
+    """Plain-text SMTP server on 127.0.0.1 that accepts and discards messages.
+
+    Use as a context manager; `port` is chosen by the OS and `messages` holds
+    the size in bytes of each received message.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = socketserver.ThreadingTCPServer((host, port), _SMTPSinkHandler)
+        self.server.daemon_threads = True
+        self.server.messages = []
+        self.host, self.port = self.server.server_address
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def messages(self):
+        return self.server.messages
+
+    def __enter__(self):
+        self._thread.start()
+        logging.info(f"Local SMTP sink listening on {self.host}:{self.port}")
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+def load_transcript_corpus(corpus_dir):
+    """Loads saved transcripts (as written by OutputManager.save_transcript) as email dicts.
+
+    The cleaned text is wrapped back into a newsletter-like HTML body (with a
+    footer block) so that ContentProcessor's HTML cleaning does real work.
+    """
+    emails = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.endswith(".txt"): continue
+        with open(os.path.join(corpus_dir, filename), encoding='utf-8') as f:
+            raw = f.read()
+        header, _, content = raw.partition(" CLEANED CONTENT ")
+        content = content.lstrip("=").strip()
+        subject = re.search(r"^Subject: (.*)$", header, re.M)
+        sender = re.search(r"^From: (.*)$", header, re.M)
+        emails.append({
+            "subject": subject.group(1).strip() if subject else filename,
+            "from": sender.group(1).strip() if sender else "unknown@example.com",
+            "body": transcript_to_html(content),
+            "source_file": filename,
+        })
+    return emails
+
+
+def transcript_to_html(text):
+    """Wraps plain transcript lines into a simple newsletter HTML document."""
+    paragraphs = "".join(f"<p>{escape(line)}</p>\n" for line in text.splitlines() if line.strip())
+    return ("<html><head><title>Newsletter</title><style>p{margin:0}</style></head><body>"
+            f"<div id=\"content\">{paragraphs}</div>"
+            "<div><p>You are receiving this email because you subscribed. Unsubscribe | Manage preferences</p>"
+            "<p><a href=\"https://twitter.com/x\">Twitter</a> <a href=\"https://linkedin.com/x\">LinkedIn</a></p></div>"
+            "</body></html>")
@@ -1,8 +1,9 @@
 import logging
-from gtts import gTTS
 import os
 import tempfile
 import re
+from utils.helpers import timed_import # gTTS is imported lazily on first use
+from utils import metrics
 # Removed datetime import as timestamp comes from main
 
 TTS_CHARACTER_LIMIT = 20000
@@ -10,7 +11,13 @@ TTS_CHARACTER_LIMIT = 20000
 class AudioGenerator:
     """Handles Text-to-Speech conversion using gTTS with text length limits."""
 
-    def __init__(self):
+    def __init__(self, tts_factory=None):
+        """
+        Args:
+            tts_factory (callable, optional): Called as tts_factory(text=..., lang=..., slow=...) and must
+                return an object with save(path). Defaults to gTTS; the benchmarks pass a stub.
+        """
+        self.tts_factory = tts_factory
         self.temp_dir = os.path.join(tempfile.gettempdir(), "daily_podcasts")
         os.makedirs(self.temp_dir, exist_ok=True)
         logging.info(f"AudioGenerator initialized. Temp directory: {self.temp_dir}")
@@ -46,10 +53,13 @@ class AudioGenerator:
             output_path = os.path.join(self.temp_dir, output_filename)
 
             logging.info(f"Generating audio for summary text (processing length: {len(text_to_process)} chars)...")
-            tts = gTTS(text=text_to_process, lang='en', slow=False)
+            with metrics.span("tts", chars=len(text_to_process)) as m:
+                tts_factory = self.tts_factory or timed_import("gtts").gTTS
+                tts = tts_factory(text=text_to_process, lang='en', slow=False)
 
-            logging.info(f"Attempting to save audio to: {output_path}")
-            tts.save(output_path)
+                logging.info(f"Attempting to save audio to: {output_path}")
+                tts.save(output_path)
+                m["bytes"] = os.path.getsize(output_path)
             logging.info(f"Audio file saved successfully: {output_path}")
             return output_path
 
@@ -0,0 +1,28 @@
+import logging
+
+# --- Packing short emails into shared LLM prompts ---
+# Short announcements pay the full prompt overhead for a few lines of text. They are
+# grouped into bins that fit the context window and summarized with one call per bin.
+
+def pack_items(sizes, capacity):
+    """
+    Next-fit bin packing in the given (rank) order: a bin takes consecutive items until
+    the next one does not fit. Keeps each bin's items adjacent in rank, so summarizing
+    a bin never runs low-ranked items ahead of higher-ranked ones.
+
+    Args:
+        sizes (list[int]): Token cost of each item (text + its share of generation).
+        capacity (int): Token capacity of one bin (one prompt).
+
+    Returns:
+        list[list[int]]: Item indexes per bin, in order. Items larger than the capacity
+            get a bin of their own.
+    """
+    groups = []; remaining = 0
+    for i, size in enumerate(sizes):
+        if groups and size <= remaining:
+            groups[-1].append(i); remaining -= size
+        else:
+            groups.append([i]); remaining = capacity - size
+    logging.info(f"Packed {len(sizes)} items into {len(groups)} prompts (capacity {capacity} tokens).")
+    return groups
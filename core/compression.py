@@ -0,0 +1,103 @@
+import logging
+from utils.helpers import timed_import # numpy is imported lazily, only when a text needs compressing
+from core.relevance import tokenize, split_sentences
+
+# --- Extractive pre-compression of LLM prompts ---
+# With n_ctx=2048 only a small slice of a newsletter fits in the prompt. Instead of
+# cutting the text at a fixed character count, the most central sentences
+# (TextRank over TF-IDF cosine similarity) are kept until the token budget is full.
+
+def estimate_tokens(text):
+    """Rough token count for English text (~4 chars per token) when no tokenizer is given."""
+    return len(text) // 4 + 1
+
+
+def sentence_centrality(sentences, damping=0.85, iterations=30):
+    """
+    TextRank scores for sentences, using TF-IDF cosine similarity as edge weights.
+
+    Returns:
+        numpy.ndarray: One score per sentence (sums to 1).
+    """
+    np = timed_import("numpy")
+    n = len(sentences)
+    if n == 0: return np.zeros(0)
+    if n == 1: return np.ones(1)
+    token_lists = [tokenize(s) for s in sentences]
+    vocab = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(token_lists):
+        for token in tokens:
+            rows.append(i); cols.append(vocab.setdefault(token, len(vocab)))
+    if not vocab: return np.full(n, 1.0 / n)
+    tf = np.zeros((n, len(vocab)))
+    np.add.at(tf, (np.array(rows), np.array(cols)), 1.0)
+    idf = np.log((1 + n) / (1 + (tf > 0).sum(axis=0))) + 1
+    tfidf = tf * idf
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Sentences with no overlap link uniformly to all others
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6: scores = updated; break
+        scores = updated
+    return scores
+
+
+def truncate_to_tokens(text, token_budget, count_tokens=None):
+    """Longest word prefix of text within token_budget (binary search over the word count)."""
+    count_tokens = count_tokens or estimate_tokens
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= token_budget: low = middle
+        else: high = middle - 1
+    return " ".join(words[:low])
+
+
+def compress_to_budget(text, token_budget, count_tokens=None, lead_bias=0.1):
+    """
+    Compresses text to its most central sentences within a token budget.
+
+    Args:
+        text (str): Cleaned email text.
+        token_budget (int): Maximum tokens for the returned text.
+        count_tokens (callable, optional): Exact token counter (e.g. LocalLLM.count_tokens).
+        lead_bias (float): Extra weight for early sentences (newsletters lead with headlines).
+
+    Returns:
+        str: Selected sentences in original order, one per line (text unchanged if it already fits).
+    """
+    count_tokens = count_tokens or estimate_tokens
+    if not text or token_budget <= 0: return ""
+    if count_tokens(text) <= token_budget: return text
+
+    np = timed_import("numpy")
+    sentences = split_sentences(text)
+    if not sentences: return truncate_to_tokens(text, token_budget, count_tokens)
+    scores = sentence_centrality(sentences)
+    scores = scores / (scores.max() or 1.0) + lead_bias / (1 + np.arange(len(sentences)))
+
+    chosen = []; used = 0
+    for i in np.argsort(-scores):
+        cost = count_tokens(sentences[i]) + 1 # + newline
+        if used + cost > token_budget: continue # A shorter sentence may still fit
+        chosen.append(int(i)); used += cost
+    if token_budget - used >= token_budget // 2:
+        # Long unpunctuated lines (one-line bodies, lists without full stops) never fit whole:
+        # cut the best sentence left out down to the remaining budget rather than losing it
+        for i in np.argsort(-scores):
+            if int(i) in chosen: continue
+            piece = truncate_to_tokens(sentences[i], token_budget - used - 1, count_tokens)
+            if piece: sentences[i] = piece; chosen.append(int(i)); used += count_tokens(piece) + 1
+            break
+    compressed = "\n".join(sentences[i] for i in sorted(chosen))
+    logging.info(f"Compressed prompt text: {len(chosen)}/{len(sentences)} sentences, {len(text)} -> {len(compressed)} chars (~{used} tokens).")
+    return compressed
@@ -1,18 +1,29 @@
 import logging
 import re
-from bs4 import BeautifulSoup, Comment, NavigableString, Tag
 from utils.helpers import *
+from utils.helpers import timed_import # bs4/lxml are imported lazily on first parse
+from utils import metrics
+from core import relevance
+from core import compression
+from core import batching
+from llm.local_llm import BATCH_SUMMARY_TOKENS
 
 class ContentProcessor:
     """Cleans HTML email body content and generates summaries using an LLM."""
 
-    def __init__(self, llm_instance):
+    def __init__(self, llm_instance, prompt_token_budget=0, batch_item_tokens=0):
         """
         Initializes the ContentProcessor.
         Args:
             llm_instance (LocalLLM): An instance of the LocalLLM class for summarization.
+            prompt_token_budget (int): Max tokens of email text per prompt. Longer texts are
+                compressed to their most central sentences; 0 keeps the char_length cut.
+            batch_item_tokens (int): Emails up to this many tokens may share one LLM call
+                (see summarize_batch); 0 disables packing.
         """
         self.llm = llm_instance
+        self.prompt_token_budget = prompt_token_budget
+        self.batch_item_tokens = batch_item_tokens
         logging.info("ContentProcessor initialized for cleaning/summarizing email bodies.")
 
     def _clean_html_body(self, html_content):
@@ -24,6 +35,7 @@ class ContentProcessor:
             return ""
 
         logging.info("Parsing and cleaning HTML email body...")
+        BeautifulSoup = timed_import("bs4").BeautifulSoup
         try: # Add try block for BeautifulSoup parsing
             soup = BeautifulSoup(html_content, 'lxml') # Use lxml parser if installed
         except Exception as e:
@@ -124,29 +136,111 @@ class ContentProcessor:
         logging.info(f"Extracted {len(cleaned_text)} chars of cleaned text from email body.")
         return cleaned_text
 
-    def clean_and_summarize_email_body(self, email_body_html, char_length):
+    def clean_email_body(self, email_body_html):
+        """Cleans the HTML email body. Returns the cleaned text ("" on failure)."""
+        with metrics.span("html_clean", bytes=len(email_body_html.encode('utf-8', errors='replace')) if email_body_html else 0) as m:
+            cleaned_text = self._clean_html_body(email_body_html)
+            m["chars"] = len(cleaned_text) if cleaned_text else 0
+        return cleaned_text
+
+    def summarize_cleaned_text(self, cleaned_text, char_length, max_tokens=None):
         """
-        Cleans the HTML email body and generates a summary using the LLM.
+        Summarizes already cleaned text with the LLM.
 
         Args:
-            email_body_html (str): The raw HTML content of the email body.
+            max_tokens (int, optional): Generation budget for this email (from relevance allocation).
 
         Returns:
-            tuple: (cleaned_text, summary_text) or (None, None) on failure.
+            str: The summary, or a string starting with "Error:" on failure.
         """
-        cleaned_text = self._clean_html_body(email_body_html)
-
         if not cleaned_text or len(cleaned_text) < 50:
             logging.warning("Cleaned email content is too short to summarize meaningfully.")
-            return cleaned_text, "Error: Cleaned content too short for summary."
+            return "Error: Cleaned content too short for summary."
 
         summary = "Error: Summarization Failed"
         if self.llm and self.llm.llm:
-            print(f'Summarizing part of cleaned text: {cleaned_text[:char_length]}...')  # Debugging output
-            summary = self.llm.summarize(cleaned_text[:char_length])
+            prompt_text = self.compress_for_prompt(cleaned_text, max_tokens) if self.prompt_token_budget else cleaned_text[:char_length]
+            print(f'Summarizing part of cleaned text: {prompt_text[:char_length]}...')  # Debugging output
+            if max_tokens: summary = self.llm.summarize(prompt_text, max_length=max_tokens)
+            else: summary = self.llm.summarize(prompt_text)
         else:
             summary = "Error: LLM not available for summarization."
             logging.warning("LLM not available, cannot generate summary.")
 
-        return cleaned_text, summary
+        return summary
+
+    def compress_for_prompt(self, cleaned_text, max_tokens=None):
+        """Cuts cleaned text down to the prompt token budget (and what the context window leaves free)."""
+        budget = min(self.prompt_token_budget, self.llm.prompt_token_budget(max_tokens))
+        with metrics.span("compress", chars=len(cleaned_text)):
+            return compression.compress_to_budget(cleaned_text, budget, self.llm.count_tokens)
+
+    def fits_batch(self, cleaned_text):
+        """True if the text is short enough to be packed with other emails into one prompt."""
+        if not self.batch_item_tokens or not (self.llm and self.llm.llm): return False
+        if not cleaned_text or len(cleaned_text) < 50: return False
+        return self.llm.count_tokens(cleaned_text) <= self.batch_item_tokens
+
+    def pack_batches(self, cleaned_texts, max_tokens_list=None):
+        """
+        Groups short cleaned texts (in rank order) into packed prompts that fit the context.
+
+        Each text costs its tokens + its generation room + marker overhead; the packed
+        instruction is measured with the model's tokenizer. Groups hold consecutive texts,
+        so a group never pulls lower-ranked emails ahead of higher-ranked ones.
+
+        Returns:
+            list[list[int]]: Text indexes per prompt, in rank order.
+        """
+        max_tokens_list = max_tokens_list or [None] * len(cleaned_texts)
+        fixed, per_item = self.llm.batch_prompt_overhead()
+        sizes = [self.llm.count_tokens(text) + (max_tokens or BATCH_SUMMARY_TOKENS) + per_item
+                 for text, max_tokens in zip(cleaned_texts, max_tokens_list)]
+        return batching.pack_items(sizes, self.llm.n_ctx - fixed)
+
+    def summarize_batch(self, cleaned_texts, char_length, max_tokens_list=None):
+        """
+        Summarizes one group from pack_batches with a single packed LLM prompt.
+
+        Any text whose summary cannot be parsed from the packed answer (or a group of one)
+        is summarized with its own call via summarize_cleaned_text.
 
+        Args:
+            max_tokens_list (list, optional): Per-text generation budget (None = default).
+
+        Returns:
+            list[str]: One summary per text, same error convention as summarize_cleaned_text.
+        """
+        max_tokens_list = max_tokens_list or [None] * len(cleaned_texts)
+        summaries = [None] * len(cleaned_texts)
+        if len(cleaned_texts) > 1:
+            logging.info(f"Summarizing {len(cleaned_texts)} short emails in one prompt.")
+            with metrics.span("llm_batch", items=len(cleaned_texts), chars=sum(len(text) for text in cleaned_texts)):
+                summaries = self.llm.summarize_batch(cleaned_texts, max_length=sum(m or BATCH_SUMMARY_TOKENS for m in max_tokens_list))
+        for i, summary in enumerate(summaries):
+            if summary is not None: continue
+            if len(cleaned_texts) > 1: logging.warning(f"No summary parsed for packed item {i + 1}/{len(cleaned_texts)}. Retrying it alone.")
+            summaries[i] = self.summarize_cleaned_text(cleaned_texts[i], char_length, max_tokens=max_tokens_list[i])
+        return summaries
+
+    def summarize_extractive(self, cleaned_text, interests=None):
+        """Cheap summary without the LLM (used for low-relevance emails). Same error convention."""
+        if not cleaned_text or len(cleaned_text) < 50:
+            logging.warning("Cleaned email content is too short to summarize meaningfully.")
+            return "Error: Cleaned content too short for summary."
+        with metrics.span("extractive", chars=len(cleaned_text)):
+            summary = relevance.extractive_summary(cleaned_text, interests)
+        return summary or "Error: Extractive summary was empty."
+
+    def clean_and_summarize_email_body(self, email_body_html, char_length):
+        """
+        Cleans the HTML email body and generates a summary using the LLM.
+
+        Args:
+            email_body_html (str): The raw HTML content of the email body.
+
+        Returns:
+            tuple: (cleaned_text, summary_text) or (None, None) on failure.
+        """
+        cleaned_text = self.clean_email_body(email_body_html)
+        return cleaned_text, self.summarize_cleaned_text(cleaned_text, char_length)
@@ -6,15 +6,18 @@ import re
 # --- Keep date, timedelta ---
 from datetime import date, timedelta
 # ---------------------------
-from bs4 import BeautifulSoup # Keep for HTML parsing
+from utils import metrics
 
 class EmailReader:
     """Handles connection to IMAP server and fetching email bodies."""
 
-    def __init__(self, email_address, password, server="imap.gmail.com"):
+    def __init__(self, email_address, password, server="imap.gmail.com", port=None, use_ssl=True):
         self.email_address = email_address
         self.password = password
         self.server = server
+        # port/use_ssl allow plain IMAP to a local stand-in (see benchmarks/imap_replay.py)
+        self.port = port
+        self.use_ssl = use_ssl
         self.mail = None
         self.connected = False
         logging.info("EmailReader initialized to fetch email bodies.")
@@ -24,7 +27,8 @@ class EmailReader:
         if self.connected: return True
         try:
             logging.info(f"Connecting to IMAP server: {self.server}")
-            self.mail = imaplib.IMAP4_SSL(self.server)
+            if self.use_ssl: self.mail = imaplib.IMAP4_SSL(self.server, self.port or imaplib.IMAP4_SSL_PORT)
+            else: self.mail = imaplib.IMAP4(self.server, self.port or imaplib.IMAP4_PORT)
             logging.info(f"Logging in as {self.email_address}")
             status, _ = self.mail.login(self.email_address, self.password)
             if status == 'OK': self.connected = True; return True
@@ -49,7 +53,7 @@ class EmailReader:
             target_date (date): The date object representing the start date (exclusive).
 
         Returns:
-            list: List of dicts: {'subject': str, 'from': str, 'body': str (HTML preferred)}
+            list: List of dicts: {'subject': str, 'from': str, 'body': str (HTML preferred), 'message_id': str}
         """
         if not self.connected: logging.error("Not connected..."); return []
         if not allowed_senders: logging.warning("No allowed senders..."); return []
@@ -67,7 +71,9 @@ class EmailReader:
             search_criteria = f'SINCE "{date_str}"'
             # ----------------------------------
 
-            status, messages = self.mail.search(None, search_criteria)
+            with metrics.span("imap_search") as m:
+                status, messages = self.mail.search(None, search_criteria)
+                m["messages"] = len(messages[0].split()) if status == "OK" and messages and messages[0] else 0
 
             if status != "OK": logging.error(f"Error searching: {status}, {messages}"); return []
             if not messages or not messages[0]: logging.info("No email IDs found."); return []
@@ -81,26 +87,32 @@ class EmailReader:
             for email_id in reversed(email_ids):
                 try: # Add inner try block for fetch/parse resilience
                     email_id_bytes = email_id if isinstance(email_id, bytes) else email_id.encode('ascii')
-                    status, msg_data = self.mail.fetch(email_id_bytes, "(RFC822)")
+                    with metrics.span("imap_fetch", uid=email_id_bytes.decode()) as m:
+                        status, msg_data = self.mail.fetch(email_id_bytes, "(RFC822)")
+                        m["bytes"] = sum(len(part[1]) for part in msg_data if isinstance(part, tuple)) if status == "OK" else 0
                     if status != "OK":
                         logging.warning(f"Failed to fetch email ID {email_id_bytes.decode()}")
                         continue
 
                     for response_part in msg_data:
                         if isinstance(response_part, tuple):
-                            msg = email.message_from_bytes(response_part[1])
-                            from_header = msg.get("From", "")
-                            sender_email = email.utils.parseaddr(from_header)[1].lower()
-                            if sender_email not in allowed_senders_lower: continue
-
-                            subject_header = msg.get("Subject", "No Subject")
-                            subject, encoding = decode_header(subject_header)[0]
-                            if isinstance(subject, bytes): subject = subject.decode(encoding if encoding else "utf-8", errors='replace')
-
-                            logging.info(f"Processing email from '{sender_email}' with subject '{subject}'")
-                            fetched_count += 1
-                            body = self._get_email_body(msg, prefer_html=True)
-                            if body: emails_data.append({"subject": subject, "from": sender_email, "body": body})
+                            with metrics.span("mime_parse", uid=email_id_bytes.decode(), bytes=len(response_part[1])) as m:
+                                msg = email.message_from_bytes(response_part[1])
+                                from_header = msg.get("From", "")
+                                sender_email = email.utils.parseaddr(from_header)[1].lower()
+                                m["allowed"] = sender_email in allowed_senders_lower
+                                if sender_email not in allowed_senders_lower: continue
+
+                                subject_header = msg.get("Subject", "No Subject")
+                                subject, encoding = decode_header(subject_header)[0]
+                                if isinstance(subject, bytes): subject = subject.decode(encoding if encoding else "utf-8", errors='replace')
+
+                                logging.info(f"Processing email from '{sender_email}' with subject '{subject}'")
+                                fetched_count += 1
+                                body = self._get_email_body(msg, prefer_html=True)
+                                m["chars"] = len(body)
+                            if body: emails_data.append({"subject": subject, "from": sender_email, "body": body,
+                                                         "message_id": (msg.get("Message-ID") or "").strip()})
                             else: logging.warning(f"Could not extract body for email '{subject}' from {sender_email}")
                 except Exception as e_inner:
                      logging.error(f"Error processing individual email ID {email_id}: {e_inner}", exc_info=False) # Log error but continue loop
@@ -1,5 +1,4 @@
 import logging
-import pandas as pd
 import os
 import tempfile
 import smtplib
@@ -7,17 +6,24 @@ import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+from utils.helpers import timed_import # pandas is imported lazily when the report is built
+from utils import metrics
 # Removed date import, timestamp comes from main
 
 class OutputManager:
     """Handles creating Excel report, saving transcripts, and sending email."""
 
-    def __init__(self, gmail_email, gmail_password, target_email, transcript_dir):
+    def __init__(self, gmail_email, gmail_password, target_email, transcript_dir,
+                 smtp_host="smtp.gmail.com", smtp_port=465, smtp_use_ssl=True):
         self.gmail_email = gmail_email
         self.gmail_password = gmail_password
         self.target_email = target_email
         self.temp_dir = tempfile.gettempdir()
         self.transcript_dir = transcript_dir
+        # SMTP endpoint is overridable so benchmarks can deliver to a local stand-in server
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.smtp_use_ssl = smtp_use_ssl
         os.makedirs(self.transcript_dir, exist_ok=True)
 
     # --- Modified to accept timestamp_str ---
@@ -36,6 +42,7 @@ class OutputManager:
         """
         if not processed_data: logging.info("No data for Excel."); return None
         try:
+            pd = timed_import("pandas")
             df = pd.DataFrame(processed_data)
             columns_order = ['sender', 'summary', 'cleaned_content']
             for col in columns_order:
@@ -48,7 +55,9 @@ class OutputManager:
             output_path = os.path.join(self.temp_dir, filename)
 
             logging.info(f"Creating Excel report with summaries at: {output_path}")
-            report_df.to_excel(output_path, index=False, engine='openpyxl')
+            with metrics.span("excel", rows=len(report_df)) as m:
+                report_df.to_excel(output_path, index=False, engine='openpyxl')
+                m["bytes"] = os.path.getsize(output_path)
             logging.info("Excel report created successfully.")
             return output_path
 
@@ -87,19 +96,22 @@ class OutputManager:
         try:
             msg = MIMEMultipart(); msg['From'] = self.gmail_email; msg['To'] = self.target_email; msg['Subject'] = subject
             msg.attach(MIMEText(body, 'plain'))
-            attached_count = 0
+            attached_count = 0; attached_bytes = 0
             for file_path in attachments:
                 if file_path and os.path.exists(file_path):
                     filename = os.path.basename(file_path)
                     try:
-                        with open(file_path, "rb") as attachment_file: part = MIMEApplication(attachment_file.read(), Name=filename)
+                        with open(file_path, "rb") as attachment_file: file_bytes = attachment_file.read()
+                        part = MIMEApplication(file_bytes, Name=filename); attached_bytes += len(file_bytes)
                         part['Content-Disposition'] = f'attachment; filename="{filename}"'
                         msg.attach(part); logging.info(f"Attaching file: {filename}"); attached_count += 1
                     except Exception as e: logging.error(f"Error attaching {filename}: {e}", exc_info=True)
                 else: logging.warning(f"Attachment not found: {file_path}")
             logging.info(f"Attempting email with {attached_count} attachments...")
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.ehlo(); server.login(self.gmail_email, self.gmail_password); server.send_message(msg)
+            with metrics.span("smtp", attachments=attached_count, bytes=attached_bytes + len(body)):
+                smtp_class = smtplib.SMTP_SSL if self.smtp_use_ssl else smtplib.SMTP
+                with smtp_class(self.smtp_host, self.smtp_port) as server:
+                    server.ehlo(); server.login(self.gmail_email, self.gmail_password); server.send_message(msg)
             logging.info("Email sent successfully.")
             return True
         except smtplib.SMTPAuthenticationError: logging.error("SMTP Auth Error."); return False
@@ -0,0 +1,160 @@
+import logging
+import re
+from utils.helpers import timed_import # numpy is imported lazily, only when a batch is ranked
+
+# --- Relevance ranking & LLM budget allocation for the daily batch ---
+# Each cleaned email is scored with BM25 against the interest profile(s). The
+# day's token budget is then split across the best items, and low-value items
+# get a cheap extractive summary instead of an LLM call.
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours read online click view email newsletter subscribe today week new
+""".split())
+
+MIN_LLM_TOKENS = 128 # An LLM summary shorter than this is not worth the prompt overhead
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords (keeps terms like 'gpt-4o', 'c++')."""
+    return [t for t in _WORD_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def split_sentences(text, min_chars=20):
+    """Splits text into sentences/lines, dropping short fragments and repeats (captions, CTAs)."""
+    return list(dict.fromkeys(s.strip() for s in _SENTENCE_RE.split(text or "") if len(s.strip()) > min_chars))
+
+
+def parse_interests(value):
+    """Interest profile from config: a list of terms/phrases, or a comma-separated string."""
+    if not value: return []
+    if isinstance(value, str): value = value.split(",")
+    return [term for phrase in value for term in tokenize(phrase)]
+
+
+def bm25_matrix(doc_tokens, terms, k1=1.5, b=0.75):
+    """
+    BM25 weight of every term in every document, vectorized with NumPy.
+
+    Args:
+        doc_tokens (list[list[str]]): Tokenized documents.
+        terms (list[str]): Vocabulary to score (the interest terms).
+
+    Returns:
+        numpy.ndarray: Shape (len(doc_tokens), len(terms)).
+    """
+    np = timed_import("numpy")
+    term_index = {t: j for j, t in enumerate(terms)}
+    tf = np.zeros((len(doc_tokens), len(terms)), dtype=np.float64)
+    for i, tokens in enumerate(doc_tokens):
+        for token in tokens:
+            j = term_index.get(token)
+            if j is not None: tf[i, j] += 1
+    doc_len = np.array([len(t) for t in doc_tokens], dtype=np.float64)
+    avg_len = doc_len.mean() if len(doc_len) and doc_len.mean() > 0 else 1.0
+    df = (tf > 0).sum(axis=0)
+    n = len(doc_tokens)
+    idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    return idf * tf * (k1 + 1) / (tf + norm[:, None])
+
+
+def score_documents(texts, interest_profiles, recipients=None):
+    """
+    Scores each text against the interest profiles of the recipients that receive it.
+
+    Each profile's BM25 scores are scaled so its best match is 1.0; a profile without
+    interests rates every text 1.0. A text's score is its best among its recipients.
+
+    Args:
+        texts (list[str]): Cleaned email bodies.
+        interest_profiles (list[list[str]]): Tokenized interest profiles, one per recipient.
+        recipients (list[list[int]], optional): Per text, indexes into interest_profiles of
+            the recipients that receive it (default: all of them).
+
+    Returns:
+        list[float]: One score per text in [0, 1] (all 1.0 if no interests are configured).
+    """
+    np = timed_import("numpy")
+    if not texts: return []
+    if recipients is None: recipients = [range(len(interest_profiles))] * len(texts)
+    active = [q for q, profile in enumerate(interest_profiles) if profile]
+    scaled = np.ones((len(texts), len(interest_profiles)))
+    if active:
+        terms = sorted({t for q in active for t in interest_profiles[q]})
+        weights = bm25_matrix([tokenize(t) for t in texts], terms)
+        # Query matrix: one column per profile selecting (and counting) its terms
+        term_index = {t: j for j, t in enumerate(terms)}
+        queries = np.zeros((len(terms), len(active)))
+        for column, q in enumerate(active):
+            for term in interest_profiles[q]: queries[term_index[term], column] += 1
+        raw = weights @ queries
+        best = raw.max(axis=0)
+        scaled[:, active] = np.divide(raw, best, out=np.zeros_like(raw), where=best > 0)
+    return [max((float(scaled[i, q]) for q in recipients[i]), default=1.0) for i in range(len(texts))]
+
+
+def allocate_budget(scores, token_budget=0, min_relative_score=0.0, default_max_tokens=None):
+    """
+    Ranks items and divides the token budget among them.
+
+    With min_relative_score > 0, items with no interest overlap or scoring below
+    min_relative_score * best score are assigned extractive summaries, as are items that
+    would get fewer than MIN_LLM_TOKENS. With token_budget=0 every remaining item gets
+    default_max_tokens (no budget).
+
+    Returns:
+        list[dict]: One per item, in rank order: {'index', 'score', 'rank', 'mode': 'llm'|'extractive', 'max_tokens'}.
+    """
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    best = scores[order[0]] if order else 0.0
+    plan = []
+    candidates = []
+    for rank, i in enumerate(order, start=1):
+        entry = {"index": i, "score": round(float(scores[i]), 4), "rank": rank, "mode": "extractive", "max_tokens": 0}
+        plan.append(entry)
+        if min_relative_score > 0 and (scores[i] <= 0 or scores[i] < min_relative_score * best): continue
+        candidates.append(entry)
+
+    if not token_budget:
+        for entry in candidates: entry["mode"] = "llm"; entry["max_tokens"] = default_max_tokens
+        return plan
+
+    # Proportional split; drop the weakest candidate while anyone would fall under the minimum
+    while candidates:
+        total = sum(max(e["score"], 1e-9) for e in candidates)
+        shares = [int(token_budget * max(e["score"], 1e-9) / total) for e in candidates]
+        if min(shares) >= MIN_LLM_TOKENS: break
+        candidates.pop()
+    for entry, share in zip(candidates, shares if candidates else []):
+        entry["mode"] = "llm"; entry["max_tokens"] = share
+    return plan
+
+
+def extractive_summary(text, interests=None, max_sentences=5, max_chars=1200):
+    """
+    Cheap summary: the sentences with the most interest-term weight (lead sentences
+    if there are no interests), kept in their original order.
+    """
+    sentences = split_sentences(text)
+    if not sentences: return (text or "")[:max_chars].strip()
+    if interests:
+        scores = score_documents(sentences, [interests])
+        # Small lead bias so ties favour the start of the newsletter
+        scores = [s + 0.01 / (i + 1) for i, s in enumerate(scores)]
+        chosen = sorted(sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_sentences])
+    else:
+        chosen = list(range(min(max_sentences, len(sentences))))
+    summary = ""
+    for i in chosen:
+        if summary and len(summary) + len(sentences[i]) > max_chars: break
+        summary += (" " if summary else "") + sentences[i]
+    logging.info(f"Extractive summary: {len(chosen)} of {len(sentences)} sentences, {len(summary)} chars.")
+    return summary
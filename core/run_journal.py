@@ -0,0 +1,179 @@
+import logging
+import os
+import json
+import hashlib
+import shutil
+from datetime import datetime
+
+# Stages an email moves through, in order. An email's "stage" is the last one completed.
+STAGES = ["fetched", "cleaned", "summarized", "audio", "delivered"]
+
+class RunJournal:
+    """Durable per-run progress record so an interrupted workflow can resume.
+
+    Layout: <journal_dir>/run_<run_id>/journal.json plus an artifacts/ folder with
+    the raw body, cleaned text, summary and MP3 of each email. The journal file is
+    rewritten atomically after every step, so a crash loses at most the step in flight.
+    """
+
+    def __init__(self, journal_dir, run_id, resume=True):
+        self.run_id = run_id
+        self.run_dir = os.path.join(journal_dir, f"run_{run_id}")
+        self.artifacts_dir = os.path.join(self.run_dir, "artifacts")
+        self.path = os.path.join(self.run_dir, "journal.json")
+        self.resumed = False
+        self.state = None
+
+        if resume and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f: state = json.load(f)
+                if state.get("completed"):
+                    logging.info(f"Previous run '{run_id}' was already delivered. Starting a new journal.")
+                else:
+                    self.state = state; self.resumed = True
+                    done = sum(1 for e in state["emails"].values() if e["stage"] != "fetched")
+                    logging.info(f"Resuming run '{run_id}' from journal ({len(state['order'])} emails, {done} past 'fetched').")
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Could not read run journal '{self.path}': {e}. Starting a new journal.")
+
+        if self.state is None:
+            if os.path.isdir(self.run_dir): shutil.rmtree(self.run_dir, ignore_errors=True)
+            self.state = {"run_id": run_id, "created": datetime.now().isoformat(timespec='seconds'),
+                          "fetch_complete": False, "completed": False, "delivered_profiles": [], "delivered_keys": {}, "order": [], "emails": {}}
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        self._save()
+
+    # --- Persistence helpers ---
+    def _save(self):
+        """Writes the journal atomically (temp file + rename)."""
+        self.state["updated"] = datetime.now().isoformat(timespec='seconds')
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _write_artifact(self, key, name, text):
+        path = os.path.join(self.artifacts_dir, f"{key}.{name}")
+        with open(path, 'w', encoding='utf-8') as f: f.write(text)
+        return path
+
+    def _read_artifact(self, key, name):
+        path = self.state["emails"][key]["artifacts"].get(name)
+        if not path or not os.path.exists(path): return None
+        with open(path, 'r', encoding='utf-8') as f: return f.read()
+
+    def _advance(self, key, stage):
+        entry = self.state["emails"][key]
+        if STAGES.index(stage) > STAGES.index(entry["stage"]): entry["stage"] = stage
+    # ---------------------------
+
+    @staticmethod
+    def email_key(email_data):
+        """Stable key for an email: mailbox + Message-ID if present, else a hash of sender/subject/body."""
+        basis = email_data.get("message_id") or "\n".join(
+            [email_data.get("from", ""), email_data.get("subject", ""), email_data.get("body", "")])
+        basis = email_data.get("mailbox", "") + "\n" + basis
+        return hashlib.sha1(basis.encode('utf-8', errors='replace')).hexdigest()[:16]
+
+    @property
+    def fetch_complete(self):
+        return self.state["fetch_complete"]
+
+    def record_fetched(self, emails):
+        """Stores the fetched emails (raw bodies on disk) and marks the fetch stage complete.
+
+        Emails already in the journal are skipped, so a re-fetch on resume only adds new mail.
+        Returns the number of emails added.
+        """
+        added = 0
+        for email_data in emails:
+            key = self.email_key(email_data)
+            if key in self.state["emails"]: continue
+            added += 1
+            raw_path = self._write_artifact(key, "raw.html", email_data.get("body", ""))
+            self.state["emails"][key] = {"from": email_data.get("from", ""), "subject": email_data.get("subject", ""),
+                                         "message_id": email_data.get("message_id", ""), "mailbox": email_data.get("mailbox", ""),
+                                         "stage": "fetched", "artifacts": {"raw": raw_path}}
+            self.state["order"].append(key)
+        self.state["fetch_complete"] = True
+        self._save()
+        return added
+
+    def fetched_emails(self):
+        """Returns the journaled emails in fetch order, in the same shape EmailReader returns."""
+        emails = []
+        for key in self.state["order"]:
+            entry = self.state["emails"][key]
+            emails.append({"subject": entry["subject"], "from": entry["from"], "message_id": entry["message_id"],
+                           "mailbox": entry.get("mailbox", ""), "body": self._read_artifact(key, "raw") or ""})
+        return emails
+
+    def has_reached(self, key, stage):
+        entry = self.state["emails"].get(key)
+        return bool(entry) and STAGES.index(entry["stage"]) >= STAGES.index(stage)
+
+    def record_cleaned(self, key, cleaned_text):
+        self.state["emails"][key]["artifacts"]["cleaned"] = self._write_artifact(key, "cleaned.txt", cleaned_text or "")
+        self._advance(key, "cleaned"); self._save()
+
+    def cleaned_text(self, key):
+        return self._read_artifact(key, "cleaned") or ""
+
+    def record_summary(self, key, summary_text):
+        self.state["emails"][key]["artifacts"]["summary"] = self._write_artifact(key, "summary.txt", summary_text)
+        self._advance(key, "summarized"); self._save()
+
+    def summary_text(self, key):
+        return self._read_artifact(key, "summary")
+
+    def record_audio(self, key, mp3_path):
+        """Moves the MP3 into the journal so it survives until delivery. Returns its new path.
+
+        A path already inside the journal (audio shared by duplicate emails) is recorded as is.
+        """
+        journal_path = os.path.join(self.artifacts_dir, os.path.basename(mp3_path))
+        if os.path.abspath(mp3_path) != os.path.abspath(journal_path): shutil.move(mp3_path, journal_path)
+        self.state["emails"][key]["artifacts"]["audio"] = journal_path
+        self._advance(key, "audio"); self._save()
+        return journal_path
+
+    def audio_path(self, key):
+        path = self.state["emails"][key]["artifacts"].get("audio")
+        return path if path and os.path.exists(path) else None
+
+    def is_delivered(self, profile_name):
+        return profile_name in self.state.setdefault("delivered_profiles", [])
+
+    def undelivered(self, profile_name, keys):
+        """The given emails that have not been delivered to this profile yet (in order)."""
+        delivered = set(self.state.setdefault("delivered_keys", {}).get(profile_name, []))
+        return [key for key in keys if key not in delivered]
+
+    def mark_delivered(self, profile_name, keys):
+        """Records that a profile's digest (containing the given emails) was sent."""
+        if not self.is_delivered(profile_name): self.state["delivered_profiles"].append(profile_name)
+        delivered = self.state.setdefault("delivered_keys", {}).setdefault(profile_name, [])
+        delivered.extend(key for key in keys if key not in delivered)
+        for key in keys:
+            if key in self.state["emails"]: self._advance(key, "delivered")
+        self._save()
+
+    def complete(self):
+        """Completes the run and removes the bulky artifacts (raw bodies, MP3s)."""
+        self.state["completed"] = True
+        self._save()
+        removed = 0
+        for entry in self.state["emails"].values():
+            for name in ("raw", "audio"):
+                path = entry["artifacts"].pop(name, None)
+                if path and os.path.exists(path):
+                    try: os.remove(path); removed += 1
+                    except OSError as e: logging.warning(f"Could not remove journal artifact {path}: {e}")
+        self._save()
+        logging.info(f"Run '{self.run_id}' completed in journal. Removed {removed} artifacts.")
+
+    def finish_empty(self):
+        """Completes a run that had nothing to process, so the next run fetches again."""
+        self.state["completed"] = True
+        self._save()
@@ -1,16 +1,36 @@
 import logging
 import os
+import re
 import time
-from llama_cpp import Llama
+from utils.helpers import timed_import # llama_cpp is imported lazily when a model is loaded
+from utils import metrics
+
+N_CTX = 2048 # 2048 is maximum for mistral ai
+PROMPT_OVERHEAD_TOKENS = 120 # Instruction text + [INST] tags around the email text
+SUMMARY_RESERVE_TOKENS = 512 # Generation room kept free when no per-email max_tokens is given
+BATCH_SUMMARY_TOKENS = 200 # Generation room per email in a packed prompt when no max_tokens is given
+
+_ITEM_MARKER_RE = re.compile(r"^[ \t#*]*\[\[\s*(\d+)\s*\]\][ \t:.*-]*", re.MULTILINE)
 
 class LocalLLM:
     """Handles loading and interacting with a local GGUF language model
        using llama-cpp-python."""
 
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend=None):
+        """
+        Args:
+            model_path (str): Path to the GGUF model file.
+            backend (optional): An already constructed llama_cpp.Llama-compatible object
+                (callable + tokenize). Skips model loading; used by the benchmarks.
+        """
         self.model_path = model_path
-        self.llm = None
+        self.llm = backend
         self.device = "cpu" # Keep forced CPU
+        self.n_ctx = N_CTX
+        self._batch_overhead = None # Measured on first use (see batch_prompt_overhead)
+        if self.llm is not None:
+            logging.info(f"LocalLLM using provided backend: {type(self.llm).__name__}")
+            return
         logging.warning("Forcing model loading onto CPU...")
         self._load_model()
 
@@ -23,14 +43,24 @@ class LocalLLM:
         if not os.path.isfile(self.model_path):
              logging.error(f"Path '{self.model_path}' is not a GGUF file."); return
         try:
-            n_ctx = 2048; n_gpu_layers = 0; verbose = True #2048 is maximum for mistral ai
+            n_ctx = self.n_ctx; n_gpu_layers = 0; verbose = True
             logging.info(f"Loading GGUF model from: {self.model_path}")
             logging.warning(f"Forcing CPU execution with n_gpu_layers={n_gpu_layers}.")
+            Llama = timed_import("llama_cpp").Llama
             self.llm = Llama(model_path=self.model_path, n_ctx=n_ctx, n_gpu_layers=n_gpu_layers, verbose=verbose)
             logging.info("GGUF model loaded successfully using llama-cpp-python (Backend: CPU).")
         except Exception as e:
             logging.error(f"Failed to load GGUF model: {e}", exc_info=True); self.llm = None
 
+    def count_tokens(self, text):
+        """Token count of text with the model's tokenizer (no BOS token)."""
+        return len(self.llm.tokenize(text.encode('utf-8'), add_bos=False))
+
+    def prompt_token_budget(self, max_new_tokens=None):
+        """Tokens of email text that fit in the context next to the instruction and the generated summary."""
+        reserve = min(max_new_tokens, N_CTX // 2) if max_new_tokens else SUMMARY_RESERVE_TOKENS
+        return max(0, self.n_ctx - PROMPT_OVERHEAD_TOKENS - reserve)
+
     def summarize(self, text, max_length=50000): #ValueError: Requested tokens (6772) for 40000 chars exceed context window of 2048
         """# A context window of 2048 means the AI model can process roughly 1500 words or 4000 characters at once.
         Generates a detailed summary for the given email body text.
@@ -50,24 +80,13 @@ class LocalLLM:
 #         prompt = f"""[INST] Provide a comprehensive and detailed summary of the main content of the following email text. #          Read the content provided and give summary which relevant to read ignore everything which is not important. #          Ignore greetings, sign-offs, unsubscribe links, author promotions, and other boilerplate: # Text: "{text}" [/INST] # Summary:"""
         # --------------------------------
 
-        stop_sequences = ["</s>", "[/INST]"]
         try:
             logging.info(f"Generating detailed summary for email text (length: {len(text)} chars) using llama.cpp (CPU)...")
-            start_time = time.time()
-            output = self.llm(prompt, max_tokens=max_length, stop=stop_sequences, echo=False, temperature=0.7)
-            end_time = time.time()
-            inference_time = end_time - start_time
+            summary = self._generate(prompt, max_length)
+            if summary is None: summary = "Error: Could not parse summary."
+            if summary.startswith("Summary:"): summary = summary[len("Summary:"):].strip()
 
-            summary = "Error: Could not parse summary."
-            if output and "choices" in output and isinstance(output["choices"], list) and len(output["choices"]) > 0:
-                if "text" in output["choices"][0]: summary = output["choices"][0]["text"].strip()
-
-            if isinstance(summary, str) and summary.startswith("Summary:"): summary = summary[len("Summary:"):].strip()
-
-            word_count = len(summary.split()) if isinstance(summary, str) else 0
-            logging.info(f"llama.cpp CPU Inference time: {inference_time:.2f} seconds")
-            logging.info(f"Summary generated (length: {len(summary)} chars, ~{word_count} words).")
-            
+            logging.info(f"Summary generated (length: {len(summary)} chars, ~{len(summary.split())} words).")
 
             print("=" * 80)
             print(f'Generated summary: ', summary)
@@ -79,3 +98,89 @@ class LocalLLM:
             logging.error(f"Error during llama.cpp inference: {e}", exc_info=True)
             if "llama_decode returned" in str(e): return f"Error: Summary generation failed (llama_decode error - {e})."
             else: return f"Error: Summary generation failed ({e})."
+
+    def summarize_batch(self, texts, max_length):
+        """
+        Summarizes several short emails with one prompt. Each email is marked [[n]] and the
+        model is asked to answer with the same markers, so the output can be split back up.
+
+        Args:
+            texts (list[str]): Cleaned email texts (must fit in the context together).
+            max_length (int): Generation budget for all summaries together.
+
+        Returns:
+            list: One summary per text, or None for each text whose summary could not be
+                  parsed (the caller retries those one by one).
+        """
+        if not self.llm or not texts: return [None] * len(texts)
+        try:
+            logging.info(f"Generating {len(texts)} summaries in one prompt ({sum(len(t) for t in texts)} chars) using llama.cpp (CPU)...")
+            output = self._generate(self._batch_prompt(texts), max_length)
+        except Exception as e:
+            logging.error(f"Error during batched llama.cpp inference: {e}", exc_info=True)
+            return [None] * len(texts)
+        summaries = self._split_batch_output(output or "", len(texts))
+        logging.info(f"Parsed {sum(1 for s in summaries if s)}/{len(texts)} summaries from batched output.")
+        return summaries
+
+    def batch_prompt_overhead(self):
+        """
+        Tokens the packed prompt adds around the email texts, measured on the real template.
+
+        Returns:
+            tuple: (fixed tokens for the instruction + BOS, tokens per email for its [[n]] marker and spacing).
+        """
+        if self._batch_overhead is None:
+            fixed = self.count_tokens(self._batch_prompt([])) + 1 # + BOS
+            per_item = self.count_tokens(self._batch_prompt(["", ""])) + 1 - fixed
+            # Margin for multi-digit markers/counts and tokens merging differently around real text
+            self._batch_overhead = (fixed + 8, (per_item + 1) // 2 + 4)
+        return self._batch_overhead
+
+    @staticmethod
+    def _batch_prompt(texts):
+        items = "\n\n".join(f"[[{i}]]\n{text.strip()}" for i, text in enumerate(texts, start=1))
+        return (
+        f"[INST] Below are {len(texts)} separate emails, each starting with a marker like [[1]]. Summarize each email on its own. Only include the main product updates, tutorials, or announcements, written as clean readable text without symbols like *,!@#$%^&*() so it can be converted into speech. "
+        f"Do not include greetings, dates, sender details, or links. Do not merge emails. "
+        f"Answer with one section per email, in the same order, each starting with its marker on its own line ([[1]], [[2]], ...) followed by that email's summary.\n\n{items}\n\n[/INST]"
+        )
+
+    @staticmethod
+    def _split_batch_output(output, count, min_chars=20):
+        """Maps [[n]]-marked sections of the model output to items 1..count (None if missing, repeated or too short)."""
+        markers = list(_ITEM_MARKER_RE.finditer(output))
+        sections = {}; repeated = set()
+        for marker, following in zip(markers, markers[1:] + [None]):
+            index = int(marker.group(1))
+            body = output[marker.end():following.start() if following else len(output)].strip()
+            if body.startswith("Summary:"): body = body[len("Summary:"):].strip()
+            if index in sections: repeated.add(index)
+            sections[index] = body
+        return [sections[i] if i in sections and i not in repeated and len(sections[i]) >= min_chars else None
+                for i in range(1, count + 1)]
+
+    def _generate(self, prompt, max_tokens):
+        """
+        Streams a completion so prompt evaluation (time to first token) and generation can be
+        timed separately. Returns the generated text (None if the model produced nothing).
+        """
+        with metrics.span("tokenize", chars=len(prompt)) as m:
+            prompt_tokens = len(self.llm.tokenize(prompt.encode('utf-8')))
+            m["tokens"] = prompt_tokens
+
+        stop_sequences = ["</s>", "[/INST]"]
+        start_time = time.time()
+        first_token_time = None; generated_tokens = 0; pieces = []
+        for chunk in self.llm(prompt, max_tokens=max_tokens, stop=stop_sequences, echo=False, temperature=0.7, stream=True):
+            if first_token_time is None: first_token_time = time.time()
+            generated_tokens += 1
+            if chunk and chunk.get("choices"): pieces.append(chunk["choices"][0].get("text", ""))
+        end_time = time.time()
+        if first_token_time is None: first_token_time = end_time
+        metrics.record("prompt_eval", first_token_time - start_time, tokens=prompt_tokens)
+        metrics.record("generation", end_time - first_token_time, tokens=generated_tokens, chars=len("".join(pieces)))
+        logging.info(f"llama.cpp CPU Inference time: {end_time - start_time:.2f} seconds "
+                     f"({prompt_tokens} prompt tokens, {generated_tokens} generated, "
+                     f"{generated_tokens / max(end_time - first_token_time, 1e-9):.1f} tok/s)")
+        return "".join(pieces).strip() if pieces else None
@@ -1,26 +1,134 @@
-import schedule
 import time
+_STARTUP_T0 = time.perf_counter() # Taken before any other import for the startup budget
 import logging
+import sys
+import argparse
 # --- Add datetime, timedelta, timezone ---
 from datetime import date, timedelta, datetime
 import pytz
 # -----------------------------------------
 import os
 import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Import utility functions and core classes
-from utils.helpers import setup_logging, load_config
+# (heavy libraries like pandas, bs4, gTTS and llama_cpp are imported lazily inside these modules)
+from utils.helpers import setup_logging, load_config, log_import_report, check_startup_budget, IMPORT_TIMES
 from llm.local_llm import LocalLLM
 from core.email_reader import EmailReader
 from core.content_processor import ContentProcessor
 from core.audio_generator import AudioGenerator
 from core.output_manager import OutputManager
+from core.run_journal import RunJournal
+from core import relevance
+from utils import metrics
+IMPORT_TIMES["<startup imports>"] = time.perf_counter() - _STARTUP_T0
+
+def fetch_profile_mailboxes(profiles, target_date, max_workers=4):
+    """
+    Fetches every distinct mailbox concurrently. Profiles sharing a Gmail account are
+    fetched once with the union of their allowed senders.
+
+    Returns:
+        list: Email dicts from EmailReader, each tagged with 'mailbox' (lowercased account).
+    """
+    mailboxes = {}
+    for profile in profiles:
+        mailbox = mailboxes.setdefault(profile["gmail_email"].lower(), {
+            "email": profile["gmail_email"], "password": profile["gmail_password"], "senders": set()})
+        mailbox["senders"].update(profile["allowed_senders"])
+
+    def fetch_one(mailbox):
+        metrics.set_context(mailbox=mailbox["email"])
+        email_reader = EmailReader(mailbox["email"], mailbox["password"])
+        if not email_reader.connect(): logging.error(f"Email connection failed for {mailbox['email']}."); return []
+        try:
+            # Pass the target_date object to the fetching method
+            emails = email_reader.fetch_emails_since(sorted(mailbox["senders"]), target_date=target_date)
+        finally:
+            if email_reader.connected: email_reader.disconnect()
+        for email_data in emails: email_data["mailbox"] = mailbox["email"].lower()
+        return emails
+
+    fetched = []
+    logging.info(f"Fetching {len(mailboxes)} mailbox(es) for {len(profiles)} profile(s) with up to {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(mailboxes)))) as pool:
+        for emails in pool.map(fetch_one, mailboxes.values()): fetched.extend(emails)
+    return fetched
+
+
+def profile_emails(profile, emails):
+    """Emails that belong in a profile's digest: from its mailbox and one of its allowed senders."""
+    mailbox = profile["gmail_email"].lower()
+    senders = set(profile["allowed_senders"])
+    return [e for e in emails if e.get("mailbox", mailbox) == mailbox and e.get("from", "").lower() in senders]
+
+
+def content_hash(text):
+    return hashlib.sha1((text or "").encode('utf-8', errors='replace')).hexdigest()
+
+
+def send_profile_digest(profile, items, config, report_date_str, timestamp_str, files_to_cleanup):
+    """
+    Builds the Excel report and digest email for one profile from shared results.
+
+    Args:
+        items (list): Result dicts {'sender', 'summary', 'cleaned_content', 'mp3_path'} for this profile.
+
+    Returns:
+        bool: True if the digest email was sent.
+    """
+    output_manager = OutputManager(
+        profile["gmail_email"], profile["gmail_password"],
+        profile["target_email"], config["transcript_save_dir"]
+    )
+    processed_email_data = [{k: item[k] for k in ("sender", "summary", "cleaned_content")} for item in items]
+    successful_summaries = sum(1 for item in items if not item["summary"].startswith("Error:"))
+    # Duplicate newsletters share one MP3; attach it once
+    summary_mp3_paths = list(dict.fromkeys(item["mp3_path"] for item in items if item.get("mp3_path")))
+
+    # --- 3. Create Excel Report ---
+    excel_path = output_manager.create_excel(
+        processed_email_data,
+        report_date_str=report_date_str,
+        timestamp_str=f"{timestamp_str}_{profile['name']}" if len(config["profiles"]) > 1 else timestamp_str # Pass timestamp
+    )
+    if excel_path: files_to_cleanup.append(excel_path)
+
+    # --- 4. Send Email ---
+    email_subject = f"Email Summaries & Audio for {report_date_str} ({successful_summaries} processed) - Run {timestamp_str}" # Add timestamp to subject
+    email_body = f"Processed {len(items)} emails from allowed senders received since {report_date_str}.\n"
+    email_body += f"Successfully generated summaries for {successful_summaries} emails.\n\n"
+    email_body += f"Cleaned transcripts saved locally to: {config['transcript_save_dir']}\n"
+    if excel_path: email_body += f"Summary report attached.\n"
+    else: email_body += "Failed to generate Excel report.\n"
+    if summary_mp3_paths: email_body += f"Attaching {len(summary_mp3_paths)} summary MP3s.\n"
+    else: email_body += "No MP3s generated.\n"
+    email_body += "\n--- Summary Snippets --- \n"
+    snippet_count = 0; max_snippets = 5
+    for i, data in enumerate(processed_email_data):
+         if snippet_count < max_snippets and not data['summary'].startswith("Error:"):
+              email_body += f"\n{i+1}. From: {data['sender']}\n   Summary: {data['summary'][:250]}...\n"
+              snippet_count += 1
+    files_for_email = [];
+    if excel_path: files_for_email.append(excel_path)
+    files_for_email.extend(summary_mp3_paths)
+    metrics.set_context(profile=profile["name"])
+    return output_manager.send_email(email_subject, email_body, files_for_email)
+
 
 def daily_workflow(config):
     """
     Fetches emails from allowed senders SINCE target_date, cleans the body,
     summarizes, saves transcript, creates audio FROM SUMMARY,
     generates Excel, and emails results. Uses IST timestamps.
+
+    Progress is journaled per email (see core/run_journal.py): re-running for the
+    same target date after a crash resumes at each email's first incomplete stage.
+
+    With several profiles (PROFILES_FILE), mailboxes are fetched concurrently, identical
+    newsletters are cleaned/summarized/voiced once, and each profile gets its own digest.
     """
     logging.info("--- Starting Daily Workflow (Processing Email Bodies) ---")
     start_time = time.time()
@@ -30,6 +138,7 @@ def daily_workflow(config):
     report_date_str = target_date.strftime("%Y-%m-%d") # For reporting (e.g., 2025-03-29)
     
     char_length = config['char_length']
+    profiles = config["profiles"]
 
     ist_tz = pytz.timezone('Asia/Kolkata')
     now_ist = datetime.now(ist_tz)
@@ -39,116 +148,223 @@ def daily_workflow(config):
     logging.info(f"Processing emails received since: {target_date.strftime('%Y-%m-%d')}")
     # -------------------------------------------------
 
-    # --- Initialization ---
-    email_reader = EmailReader(config["gmail_email"], config["gmail_password"])
+    # Per-stage spans for this run go to metrics/metrics_<timestamp>.jsonl
+    metrics.start_run(timestamp_str, config["metrics_dir"])
+
+    # --- Initialization (one model shared by all profiles) ---
     llm = LocalLLM(config["local_model_path"])
-    content_processor = ContentProcessor(llm)
+    content_processor = ContentProcessor(llm, prompt_token_budget=config["prompt_token_budget"],
+                                         batch_item_tokens=config["batch_item_tokens"])
     audio_generator = AudioGenerator()
     output_manager = OutputManager(
         config["gmail_email"], config["gmail_password"],
         config["target_email"], config["transcript_save_dir"]
     )
 
-    processed_email_data = []
-    summary_mp3_paths = []
     files_to_cleanup = []
 
     try:
-        # --- 1. Fetch Emails Since Target Date ---
-        if not email_reader.connect(): logging.error("Email connection failed."); return
+        # Journal keyed by target date: a re-run for the same date resumes unfinished work
+        journal = RunJournal(config["journal_dir"], report_date_str, resume=config.get("resume", True))
 
-        # Pass the target_date object to the fetching method
-        emails_to_process = email_reader.fetch_emails_since(
-            config["allowed_senders"],
-            target_date=target_date
-        )
-        email_reader.disconnect()
+        # --- 1. Fetch Emails Since Target Date ---
+        # Always fetch: on resume, mail that arrived after the interrupted attempt is merged into the journal
+        resuming_fetch = journal.fetch_complete
+        fetched_emails = fetch_profile_mailboxes(profiles, target_date, config["fetch_workers"])
+        new_emails = journal.record_fetched(fetched_emails) if fetched_emails else 0
+        if resuming_fetch:
+            emails_to_process = journal.fetched_emails()
+            logging.info(f"Resuming: {len(emails_to_process)} journaled emails ({new_emails} new since the last attempt).")
+        else:
+            emails_to_process = fetched_emails
 
         if not emails_to_process:
             logging.info(f"No emails found from allowed senders since {report_date_str}. Workflow finished.")
+            journal.finish_empty()
             return
 
         logging.info(f"Found {len(emails_to_process)} emails to process.")
 
-        # --- 2. Process Each Email ---
-        email_count = 0
+        # --- 2. Process Each Email (identical content is processed once) ---
         successful_summaries = 0
+        results = {}            # journal key -> {'sender', 'summary', 'cleaned_content', 'mp3_path'}
+        cleaned_by_raw = {}     # raw body hash -> cleaned text
+        summary_by_cleaned = {} # cleaned text hash -> summary
+        audio_by_cleaned = {}   # cleaned text hash -> MP3 path
+        cleaned_emails = []     # (email_count, email_data, journal key, cleaned text, cleaned hash)
 
-        for email_data in emails_to_process:
-            email_count += 1
+        # --- 2a. Clean every email ---
+        for email_count, email_data in enumerate(emails_to_process, start=1):
             sender = email_data.get('from', 'Unknown Sender')
             subject = email_data.get('subject', 'No Subject')
             raw_body = email_data.get('body', '')
+            email_key = RunJournal.email_key(email_data)
+            metrics.set_context(email=email_count, sender=sender)
 
-            logging.info(f"--- Processing email {email_count}/{len(emails_to_process)} from: {sender} | Subject: {subject} ---")
+            logging.info(f"--- Cleaning email {email_count}/{len(emails_to_process)} from: {sender} | Subject: {subject} ---")
             if not raw_body: logging.warning("Empty body. Skipping."); continue
 
-            cleaned_body, summary_text = content_processor.clean_and_summarize_email_body(raw_body, int(char_length))
+            raw_hash = content_hash(raw_body)
+            if journal.has_reached(email_key, "cleaned"):
+                 cleaned_body = journal.cleaned_text(email_key)
+                 logging.info("Resuming: cleaned text loaded from journal.")
+            elif raw_hash in cleaned_by_raw:
+                 cleaned_body = cleaned_by_raw[raw_hash]
+                 journal.record_cleaned(email_key, cleaned_body)
+                 logging.info("Duplicate email body: reusing cleaned text.")
+            else:
+                 cleaned_body = content_processor.clean_email_body(raw_body)
+                 journal.record_cleaned(email_key, cleaned_body)
+                 # Save transcript using timestamp (only once per email, not again on resume)
+                 if cleaned_body: output_manager.save_transcript(sender, subject, cleaned_body, report_date_str, timestamp_str)
+            cleaned_by_raw.setdefault(raw_hash, cleaned_body)
 
             if not cleaned_body:
                  logging.warning(f"Cleaning failed/empty for email from {sender}. Skipping.")
-                 processed_email_data.append({
-                     "sender": sender, "summary": "Error: Cleaning failed.", "cleaned_content": ""
-                 })
+                 results[email_key] = {"sender": sender, "summary": "Error: Cleaning failed.", "cleaned_content": "", "mp3_path": None}
                  continue
 
-            # Save transcript using timestamp
-            output_manager.save_transcript(sender, subject, cleaned_body, report_date_str, timestamp_str)
+            cleaned_hash = content_hash(cleaned_body)
+            if journal.has_reached(email_key, "summarized"):
+                 summary_by_cleaned.setdefault(cleaned_hash, journal.summary_text(email_key))
+            cleaned_emails.append((email_count, email_data, email_key, cleaned_body, cleaned_hash))
+
+        # --- 2b. Rank unsummarized newsletters and split the LLM budget ---
+        pending = {}  # cleaned hash -> (cleaned text, [journal keys])
+        for _, _, email_key, cleaned_body, cleaned_hash in cleaned_emails:
+            if cleaned_hash in summary_by_cleaned: continue
+            pending.setdefault(cleaned_hash, (cleaned_body, []))[1].append(email_key)
+        pending_hashes = list(pending)
+        if summary_by_cleaned: logging.info(f"Resuming: {len(summary_by_cleaned)} summaries loaded from journal (skipping LLM).")
 
+        # Each newsletter is scored only for the profiles that receive it (global INTEREST_PROFILE + their own)
+        interests = relevance.parse_interests(config["interest_profile"])
+        interest_profiles = [interests + relevance.parse_interests(p.get("interests")) for p in profiles]
+        profile_keys = [{RunJournal.email_key(e) for e in profile_emails(p, emails_to_process)} for p in profiles]
+        recipients = [[q for q, keys in enumerate(profile_keys) if keys.intersection(pending[h][1])] for h in pending_hashes]
+        with metrics.span("rank", items=len(pending_hashes)):
+            scores = relevance.score_documents([pending[h][0] for h in pending_hashes], interest_profiles, recipients)
+            plan = relevance.allocate_budget(scores, config["daily_token_budget"], config["min_relevance"])
+        all_interests = sorted({t for p in interest_profiles for t in p})
+        llm_items = sum(1 for entry in plan if entry["mode"] == "llm")
+        if plan:
+            time_budget = f"{config['llm_time_budget_seconds']}s" if config['llm_time_budget_seconds'] else "unlimited"
+            logging.info(f"Relevance plan: {llm_items} LLM summaries, {len(plan) - llm_items} extractive "
+                         f"(token budget: {config['daily_token_budget'] or 'unlimited'}, time budget: {time_budget}).")
+
+        # --- 2c. Summarize unique newsletters, most relevant first ---
+        # Runs of short LLM items that are adjacent in rank are packed into shared prompts. A group
+        # runs when its best-ranked item comes up, so the time budget is checked between groups.
+        runs = [[]]
+        for entry in plan:
+            if entry["mode"] != "llm": continue
+            if content_processor.fits_batch(pending[pending_hashes[entry["index"]]][0]): runs[-1].append(entry)
+            elif runs[-1]: runs.append([])
+        batch_groups = {} # cleaned hash of a group's first item -> [plan entries] (groups of 2+ only)
+        for run in runs:
+            if len(run) < 2: continue
+            for group in content_processor.pack_batches([pending[pending_hashes[e["index"]]][0] for e in run], [e["max_tokens"] for e in run]):
+                if len(group) > 1: batch_groups[pending_hashes[run[group[0]]["index"]]] = [run[i] for i in group]
+        batched = {} # cleaned hash -> summary from a packed call
+        llm_seconds = 0.0
+        for entry in plan:
+            cleaned_hash = pending_hashes[entry["index"]]
+            cleaned_body, keys = pending[cleaned_hash]
+            metrics.set_context(rank=entry["rank"], mode=entry["mode"])
+            over_time = config["llm_time_budget_seconds"] and llm_seconds >= config["llm_time_budget_seconds"]
+            if cleaned_hash in batched:
+                 summary_text = batched[cleaned_hash]
+            elif entry["mode"] == "llm" and not over_time and cleaned_hash in batch_groups:
+                 group = batch_groups[cleaned_hash]
+                 logging.info(f"Summarizing {len(group)} short newsletters (ranks {group[0]['rank']}-{group[-1]['rank']}) in one packed LLM prompt.")
+                 llm_start = time.time()
+                 batch_summaries = content_processor.summarize_batch([pending[pending_hashes[e["index"]]][0] for e in group],
+                                                                     int(char_length), [e["max_tokens"] for e in group])
+                 llm_seconds += time.time() - llm_start
+                 batched.update((pending_hashes[e["index"]], s) for e, s in zip(group, batch_summaries))
+                 summary_text = batched[cleaned_hash]
+            elif entry["mode"] == "llm" and not over_time:
+                 logging.info(f"Summarizing newsletter ranked {entry['rank']}/{len(plan)} (score {entry['score']}) with the LLM.")
+                 llm_start = time.time()
+                 summary_text = content_processor.summarize_cleaned_text(cleaned_body, int(char_length), max_tokens=entry["max_tokens"])
+                 llm_seconds += time.time() - llm_start
+            else:
+                 if over_time and entry["mode"] == "llm": logging.warning("LLM time budget used up. Falling back to extractive summary.")
+                 logging.info(f"Extractive summary for newsletter ranked {entry['rank']}/{len(plan)} (score {entry['score']}).")
+                 summary_text = content_processor.summarize_extractive(cleaned_body, all_interests)
+            summary_by_cleaned[cleaned_hash] = summary_text
+            # Only successful summaries are journaled; failures are retried on the next run
+            if summary_text and not summary_text.startswith("Error:"):
+                 for email_key in keys: journal.record_summary(email_key, summary_text)
+
+        # --- 2d. Audio and per-email results ---
+        for email_count, email_data, email_key, cleaned_body, cleaned_hash in cleaned_emails:
+            sender = email_data.get('from', 'Unknown Sender')
+            subject = email_data.get('subject', 'No Subject')
+            metrics.set_context(email=email_count, sender=sender)
+            summary_text = summary_by_cleaned.get(cleaned_hash) or "Error: Summarization Failed"
+            if not journal.has_reached(email_key, "summarized") and not summary_text.startswith("Error:"):
+                 journal.record_summary(email_key, summary_text)
+
+            mp3_path = None
             summary_successful = summary_text and not summary_text.startswith("Error:")
             if summary_successful:
                  successful_summaries += 1
                  logging.info(f"Summary generated successfully for email from {sender}.")
-                 # Generate audio using timestamp
-                 filename_base = f"summary_{email_count}_" + re.sub(r'[^a-zA-Z0-9_-]', '_', subject)[:40]
-                 mp3_path = audio_generator.text_to_speech(summary_text, filename_base, timestamp_str) # Pass timestamp
+                 mp3_path = journal.audio_path(email_key) if journal.has_reached(email_key, "audio") else None
+                 if not mp3_path and audio_by_cleaned.get(cleaned_hash):
+                     mp3_path = journal.record_audio(email_key, audio_by_cleaned[cleaned_hash])
+                 if not mp3_path:
+                     # Generate audio using timestamp
+                     filename_base = f"summary_{email_count}_" + re.sub(r'[^a-zA-Z0-9_-]', '_', subject)[:40]
+                     mp3_path = audio_generator.text_to_speech(summary_text, filename_base, timestamp_str) # Pass timestamp
+                     # Journal keeps the MP3 until delivery (it removes it then), so it is not in files_to_cleanup
+                     if mp3_path: mp3_path = journal.record_audio(email_key, mp3_path)
                  if mp3_path:
-                     summary_mp3_paths.append(mp3_path)
-                     files_to_cleanup.append(mp3_path)
+                     audio_by_cleaned.setdefault(cleaned_hash, mp3_path)
                  else:
                      logging.warning(f"Audio generation failed for summary of email from {sender}.")
             else:
                  logging.warning(f"Summarization failed for email from {sender}. Summary: {summary_text}")
 
-            processed_email_data.append({
-                "sender": sender, "summary": summary_text, "cleaned_content": cleaned_body
-            })
+            results[email_key] = {"sender": sender, "summary": summary_text, "cleaned_content": cleaned_body, "mp3_path": mp3_path}
 
 
-        if not processed_email_data:
+        if not results:
              logging.info("No emails were processed. Workflow finished.")
              return
 
-        logging.info(f"Finished processing. Summarized {successful_summaries}/{len(emails_to_process)} emails.")
-
-        # --- 3. Create Excel Report ---
-        excel_path = output_manager.create_excel(
-            processed_email_data,
-            report_date_str=report_date_str,
-            timestamp_str=timestamp_str # Pass timestamp
-        )
-        if excel_path: files_to_cleanup.append(excel_path)
-
-        # --- 4. Send Email ---
-        email_subject = f"Email Summaries & Audio for {report_date_str} ({successful_summaries} processed) - Run {timestamp_str}" # Add timestamp to subject
-        email_body = f"Processed {len(emails_to_process)} emails from allowed senders received since {report_date_str}.\n"
-        email_body += f"Successfully generated summaries for {successful_summaries} emails.\n\n"
-        email_body += f"Cleaned transcripts saved locally to: {config['transcript_save_dir']}\n"
-        # ... (rest of email body generation same as before) ...
-        if excel_path: email_body += f"Summary report attached.\n"
-        else: email_body += "Failed to generate Excel report.\n"
-        if summary_mp3_paths: email_body += f"Attaching {len(summary_mp3_paths)} summary MP3s.\n"
-        else: email_body += "No MP3s generated.\n"
-        email_body += "\n--- Summary Snippets --- \n"
-        snippet_count = 0; max_snippets = 5
-        for i, data in enumerate(processed_email_data):
-             if snippet_count < max_snippets and not data['summary'].startswith("Error:"):
-                  email_body += f"\n{i+1}. From: {data['sender']}\n   Summary: {data['summary'][:250]}...\n"
-                  snippet_count += 1
-        files_for_email = [];
-        if excel_path: files_for_email.append(excel_path)
-        files_for_email.extend(summary_mp3_paths)
-        output_manager.send_email(email_subject, email_body, files_for_email)
+        metrics.set_context()
+        logging.info(f"Finished processing. Summarized {successful_summaries}/{len(emails_to_process)} emails "
+                     f"({len(summary_by_cleaned)} unique newsletters).")
+
+        # --- 3/4. Excel report + digest email per profile, assembled from the shared results ---
+        # Delivery is tracked per profile and email: a profile whose digest already went out
+        # only gets a new digest for mail merged in since (see the re-fetch in step 1)
+        profile_keys = {}
+        for profile in profiles:
+            keys = list(dict.fromkeys(RunJournal.email_key(e) for e in profile_emails(profile, emails_to_process)))
+            profile_keys[profile["name"]] = keys
+            undelivered = journal.undelivered(profile["name"], keys)
+            if keys and not undelivered:
+                logging.info(f"Profile '{profile['name']}': all emails already delivered in this run. Skipping."); continue
+            if journal.is_delivered(profile["name"]):
+                logging.info(f"Profile '{profile['name']}': {len(undelivered)} emails arrived after its digest was sent. Sending a follow-up digest.")
+            items = [results[k] for k in undelivered if k in results]
+            if not items:
+                logging.info(f"Profile '{profile['name']}': no emails for this profile.")
+                journal.mark_delivered(profile["name"], undelivered); continue
+            if not profile["target_email"]:
+                # Nothing to deliver to; counting it as delivered lets the run complete
+                logging.warning(f"Profile '{profile['name']}': no target email configured. Digest not emailed.")
+                journal.mark_delivered(profile["name"], undelivered); continue
+            if send_profile_digest(profile, items, config, report_date_str, timestamp_str, files_to_cleanup):
+                journal.mark_delivered(profile["name"], undelivered)
+            else:
+                logging.warning(f"Profile '{profile['name']}': digest not sent. The next run for this date will resume and retry delivery.")
+        metrics.set_context()
+
+        if all(not journal.undelivered(p["name"], profile_keys[p["name"]]) for p in profiles): journal.complete()
 
     # --- Exception handling remains the same ---
     except Exception as e:
@@ -166,23 +382,47 @@ def daily_workflow(config):
         # --- Cleanup ---
         if 'output_manager' in locals() and 'files_to_cleanup' in locals():
             output_manager.cleanup_files(files_to_cleanup)
-        if 'email_reader' in locals() and email_reader.connected:
-             email_reader.disconnect()
         end_time = time.time()
+        metrics.set_context()
+        metrics.record("workflow", end_time - start_time)
+        metrics.end_run()
         logging.info(f"--- Daily Workflow Finished. Total time: {end_time - start_time:.2f} seconds ---")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize newsletter emails into an audio digest.")
+    parser.add_argument("--check-config", action="store_true",
+                        help="Validate configuration, report startup/import time and exit without running the workflow. "
+                             "Exits 0 if OK, 1 on invalid config, 2 if the startup budget is exceeded.")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore any unfinished run journal for the target date and start from IMAP again.")
+    return parser.parse_args(argv)
+
+
 # --- Main Execution Block ---
 if __name__ == "__main__":
+    args = parse_args()
     setup_logging() # Setup logging with IST formatter
     logging.info("=============================================")
     logging.info(" Starting Modular Email Processor Script ")
     logging.info("=============================================")
     try:
-        config = load_config()
+        try:
+            config = load_config()
+        except Exception as e:
+            if not args.check_config: raise
+            logging.critical(f"Configuration check failed: {e}", exc_info=True)
+            sys.exit(1) # Any error while loading config counts as invalid config
+        config["resume"] = not args.no_resume
+        within_budget = check_startup_budget(time.perf_counter() - _STARTUP_T0, config["startup_budget_seconds"])
+        log_import_report()
+        if args.check_config:
+            logging.info("Configuration check passed." if within_budget else "Configuration OK, but startup budget exceeded.")
+            sys.exit(0 if within_budget else 2)
         logging.info(f"Running workflow immediately (processing emails since {config['target_date'].strftime('%Y-%m-%d')})...")
         daily_workflow(config)
         logging.info("Workflow run complete.")
+        log_import_report()
     except FileNotFoundError as e: logging.critical(f"CRITICAL ERROR: Missing required file: {e}.")
     except ImportError as e: logging.critical(f"CRITICAL ERROR: Missing required library: {e}. ({e})")
     except KeyboardInterrupt: logging.info("Script interrupted by user. Exiting gracefully.")
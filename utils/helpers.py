@@ -1,5 +1,9 @@
 import logging
 import os
+import re
+import sys
+import time
+import importlib
 from dotenv import load_dotenv
 import json
 # --- Add imports ---
@@ -35,6 +39,42 @@ class ISTFormatter(logging.Formatter):
 
 # --------------------------------
 
+# --- Lazy imports & startup timing ---
+# Heavy third-party modules (pandas, bs4/lxml, gTTS, llama_cpp) are imported on
+# first use through timed_import() so that config validation and --check-config
+# stay fast. Every lazy import is recorded here for the startup report.
+IMPORT_TIMES = {}
+DEFAULT_STARTUP_BUDGET_SECONDS = 2.0
+DEFAULT_PROMPT_TOKEN_BUDGET = 1024 # Email text per LLM prompt after extractive compression (0 = char_length cut)
+DEFAULT_BATCH_ITEM_TOKENS = 300 # Emails up to this size are packed several per LLM prompt (0 = one call per email)
+
+def timed_import(module_name):
+    """Imports a module on first use and records how long the import took."""
+    module = sys.modules.get(module_name)
+    if module is not None: return module
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    IMPORT_TIMES[module_name] = elapsed
+    logging.info(f"Lazy import of '{module_name}' took {elapsed * 1000:.1f} ms")
+    return module
+
+def log_import_report(top_n=10):
+    """Logs recorded import times, slowest first (similar to -X importtime)."""
+    if not IMPORT_TIMES: logging.info("Import-time report: no timed imports recorded."); return
+    logging.info(f"Import-time report ({len(sys.modules)} modules loaded in total):")
+    for name, elapsed in sorted(IMPORT_TIMES.items(), key=lambda kv: kv[1], reverse=True)[:top_n]:
+        logging.info(f"  {elapsed * 1000:9.1f} ms  {name}")
+
+def check_startup_budget(elapsed_seconds, budget_seconds):
+    """Logs startup time against the budget. Returns True if within budget."""
+    if elapsed_seconds <= budget_seconds:
+        logging.info(f"Startup took {elapsed_seconds:.3f}s (budget {budget_seconds:.2f}s).")
+        return True
+    logging.warning(f"Startup took {elapsed_seconds:.3f}s, exceeding budget of {budget_seconds:.2f}s.")
+    return False
+# -------------------------------------
+
 def setup_logging():
     """Configures logging to file and console with IST timestamps."""
     log_formatter = ISTFormatter(
@@ -66,6 +106,54 @@ def setup_logging():
     # logging.getLogger("llama_cpp").setLevel(logging.WARNING)
 
 
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def load_profiles(profiles_file, defaults):
+    """
+    Loads recipient profiles from a JSON file: a list, or {"profiles": [...]}.
+
+    Each profile: {"name", "target_email", "allowed_senders", optional "gmail_email" and
+    "gmail_app_password" (or "gmail_app_password_env" naming an env variable)}. Missing
+    Gmail credentials fall back to GMAIL_EMAIL / GMAIL_APP_PASSWORD, so several
+    recipients can share one mailbox. Invalid profiles are logged and skipped. Names are
+    reduced to letters, digits, '_' and '-' since they end up in report filenames.
+    """
+    with open(profiles_file, 'r', encoding='utf-8') as f: data = json.load(f)
+    raw_profiles = data.get("profiles", []) if isinstance(data, dict) else data
+    if not isinstance(raw_profiles, list): raise ValueError("expected a list of profiles or {\"profiles\": [...]}")
+
+    profiles = []; names = set()
+    for index, raw in enumerate(raw_profiles, start=1):
+        if not isinstance(raw, dict): logging.error(f"Profile #{index}: expected an object, got {type(raw).__name__}. Skipping."); continue
+        name = re.sub(r'[^A-Za-z0-9_-]', '_', str(raw.get("name") or "")).strip("_") or f"profile{index}"
+        senders = raw.get("allowed_senders", [])
+        interests = raw.get("interests") or []
+        if isinstance(senders, str): senders = [senders]
+        if not _is_string_list(senders):
+            logging.error(f"Profile '{name}': allowed_senders must be a string or a list of strings. Skipping."); continue
+        if not (isinstance(interests, str) or _is_string_list(interests)):
+            logging.error(f"Profile '{name}': interests must be a string or a list of strings. Skipping."); continue
+        password = raw.get("gmail_app_password")
+        if not password and raw.get("gmail_app_password_env"): password = os.getenv(raw["gmail_app_password_env"])
+        profile = {
+            "name": name,
+            "gmail_email": raw.get("gmail_email") or defaults["gmail_email"],
+            "gmail_password": password or defaults["gmail_password"],
+            "target_email": raw.get("target_email"),
+            "allowed_senders": [s.lower() for s in senders],
+            "interests": interests, # Terms/phrases for relevance ranking (list or comma-separated)
+        }
+        if name in names: logging.error(f"Profile '{name}': duplicate name. Skipping."); continue
+        if not profile["gmail_email"] or not profile["gmail_password"]:
+            logging.error(f"Profile '{name}': missing Gmail email/app password. Skipping."); continue
+        if not profile["allowed_senders"]:
+            logging.error(f"Profile '{name}': allowed_senders is empty. Skipping."); continue
+        if not profile["target_email"]:
+            logging.warning(f"Profile '{name}': target_email not set. Its digest will not be emailed (counted as delivered).")
+        names.add(name); profiles.append(profile)
+    return profiles
+
 def load_config():
     """Loads configuration from .env file, including target fetch date."""
     load_dotenv()
@@ -90,22 +178,91 @@ def load_config():
         "gmail_email": os.getenv("GMAIL_EMAIL"),
         "gmail_password": os.getenv("GMAIL_APP_PASSWORD"),
         "target_email": os.getenv("TARGET_EMAIL"),
-        "allowed_senders": json.loads(os.getenv("ALLOWED_SENDERS", '[]')),
+        "allowed_senders": [],
         "local_model_path": os.getenv("LOCAL_MODEL_PATH"),
         "transcript_save_dir": os.getenv("TRANSCRIPT_SAVE_DIR", "./email_transcripts"),
         "target_date": target_date, # Store the date object
-        "char_length": os.getenv("char_length", 1000)
+        "char_length": os.getenv("char_length", 1000),
+        "prompt_token_budget": DEFAULT_PROMPT_TOKEN_BUDGET,
+        "batch_item_tokens": DEFAULT_BATCH_ITEM_TOKENS,
+        "startup_budget_seconds": DEFAULT_STARTUP_BUDGET_SECONDS,
+        "metrics_dir": os.getenv("METRICS_DIR", "./metrics"),
+        "journal_dir": os.getenv("JOURNAL_DIR", "./run_journal"),
+        "profiles_file": os.getenv("PROFILES_FILE", ""),
+        "fetch_workers": 4,
+        "interest_profile": os.getenv("INTEREST_PROFILE", ""),
+        "daily_token_budget": 0,
+        "llm_time_budget_seconds": 0.0,
+        "min_relevance": 0.0
     }
 
+    try:
+        config["allowed_senders"] = json.loads(os.getenv("ALLOWED_SENDERS", '[]'))
+    except json.JSONDecodeError as e:
+        logging.critical(f"ALLOWED_SENDERS is not valid JSON ({e}). Expected a list like [\"news@example.com\"]. Exiting.")
+        sys.exit(1)
+    if not isinstance(config["allowed_senders"], list) or not all(isinstance(s, str) for s in config["allowed_senders"]):
+        logging.critical("ALLOWED_SENDERS must be a JSON list of email addresses. Exiting.")
+        sys.exit(1)
+
+    # --- Relevance / LLM budget (0 = unlimited) ---
+    for key, env_name, cast in (("daily_token_budget", "DAILY_TOKEN_BUDGET", int),
+                                ("llm_time_budget_seconds", "DAILY_LLM_SECONDS", float),
+                                ("min_relevance", "MIN_RELEVANCE", float)):
+        try:
+            config[key] = cast(os.getenv(env_name, config[key]))
+        except ValueError:
+            logging.warning(f"Invalid {env_name}. Using default {config[key]}.")
+
+    try:
+        config["prompt_token_budget"] = max(0, int(os.getenv("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)))
+    except ValueError:
+        logging.warning(f"Invalid PROMPT_TOKEN_BUDGET. Using default {DEFAULT_PROMPT_TOKEN_BUDGET}.")
+
+    try:
+        config["batch_item_tokens"] = max(0, int(os.getenv("BATCH_ITEM_TOKENS", DEFAULT_BATCH_ITEM_TOKENS)))
+    except ValueError:
+        logging.warning(f"Invalid BATCH_ITEM_TOKENS. Using default {DEFAULT_BATCH_ITEM_TOKENS}.")
+
+    try:
+        config["fetch_workers"] = max(1, int(os.getenv("FETCH_WORKERS", 4)))
+    except ValueError:
+        logging.warning("Invalid FETCH_WORKERS. Using default 4.")
+
+    try:
+        config["startup_budget_seconds"] = float(os.getenv("STARTUP_BUDGET_SECONDS", DEFAULT_STARTUP_BUDGET_SECONDS))
+    except ValueError:
+        logging.warning(f"Invalid STARTUP_BUDGET_SECONDS. Using default {DEFAULT_STARTUP_BUDGET_SECONDS}s.")
+
     # --- Validation ---
-    if not config["gmail_email"] or not config["gmail_password"]:
-        logging.critical("Missing GMAIL_EMAIL or GMAIL_APP_PASSWORD in .env. Exiting.")
-        exit(1)
-    if not config["target_email"]:
-        logging.warning("TARGET_EMAIL not set in .env. Email notifications will be disabled.")
-    if not config["allowed_senders"]:
-        logging.critical("ALLOWED_SENDERS is empty in .env. Cannot process emails.")
-        exit(1)
+    if config["profiles_file"]:
+        # Multi-profile mode: mailboxes/recipients/senders come from PROFILES_FILE
+        try:
+            config["profiles"] = load_profiles(config["profiles_file"], config)
+        except (OSError, ValueError) as e:
+            logging.critical(f"Could not read PROFILES_FILE '{config['profiles_file']}': {e}. Exiting.")
+            sys.exit(1)
+        if not config["profiles"]:
+            logging.critical(f"No valid profiles in '{config['profiles_file']}'. Exiting.")
+            sys.exit(1)
+        # Top-level account (used for error notifications) defaults to the first profile
+        first = config["profiles"][0]
+        for key in ("gmail_email", "gmail_password", "target_email"):
+            config[key] = config[key] or first[key]
+        config["allowed_senders"] = sorted({s for p in config["profiles"] for s in p["allowed_senders"]})
+        logging.info(f"Loaded {len(config['profiles'])} profiles from {config['profiles_file']}: {[p['name'] for p in config['profiles']]}")
+    else:
+        if not config["gmail_email"] or not config["gmail_password"]:
+            logging.critical("Missing GMAIL_EMAIL or GMAIL_APP_PASSWORD in .env. Exiting.")
+            sys.exit(1)
+        if not config["target_email"]:
+            logging.warning("TARGET_EMAIL not set in .env. Email notifications will be disabled.")
+        if not config["allowed_senders"]:
+            logging.critical("ALLOWED_SENDERS is empty in .env. Cannot process emails.")
+            sys.exit(1)
+        config["profiles"] = [{"name": "default", "gmail_email": config["gmail_email"], "gmail_password": config["gmail_password"],
+                               "target_email": config["target_email"], "allowed_senders": [s.lower() for s in config["allowed_senders"]],
+                               "interests": []}]
     if not config["local_model_path"] or not os.path.exists(config["local_model_path"]):
          logging.error(f"LOCAL_MODEL_PATH '{config['local_model_path']}' not set or GGUF file does not exist. LLM disabled.")
          config["local_model_path"] = None
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+try:
+    import resource # Not available on Windows; peak RSS is then reported as None
+except ImportError:
+    resource = None
+
+# --- Per-stage run metrics ---
+# Usage from any module (no-op when no run has been started):
+#     from utils import metrics
+#     with metrics.span("html_clean", bytes=len(html)) as m:
+#         ...
+#         m["chars"] = len(cleaned)
+# The summary table totals the "bytes", "chars" and "tokens" fields per stage.
+# Each finished span becomes one JSON line in metrics/metrics_<run_id>.jsonl.
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB (None if unknown)."""
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+class RunMetrics:
+    """Collects timing spans for one workflow run and writes them as JSON lines."""
+
+    def __init__(self, run_id, metrics_dir="./metrics"):
+        self.run_id = run_id
+        self.records = []
+        self._local = threading.local() # Context is per thread (mailboxes are fetched concurrently)
+        self.path = None
+        self._file = None
+        self._lock = threading.Lock()
+        if metrics_dir:
+            try:
+                os.makedirs(metrics_dir, exist_ok=True)
+                self.path = os.path.join(metrics_dir, f"metrics_{run_id}.jsonl")
+                self._file = open(self.path, 'a', encoding='utf-8')
+                logging.info(f"Writing run metrics to: {self.path}")
+            except OSError as e:
+                logging.error(f"Could not open metrics file in '{metrics_dir}': {e}. Metrics kept in memory only.")
+
+    @property
+    def context(self):
+        return getattr(self._local, "context", {})
+
+    def set_context(self, **fields):
+        """Sets fields (e.g. email index, sender) added to every following span in this thread."""
+        self._local.context = {k: v for k, v in fields.items() if v is not None}
+
+    @contextmanager
+    def span(self, stage, **counts):
+        """Times a block of work. Yields the record dict so callers can add counts."""
+        record = {"stage": stage, **self.context, **counts}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record["error"] = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **{k: v for k, v in record.items() if k != "stage"})
+
+    def record(self, stage, seconds, **counts):
+        """Records an externally timed span (e.g. prompt eval measured while streaming)."""
+        entry = {"run_id": self.run_id, "ts": round(time.time(), 3), "stage": stage, **self.context, **counts,
+                 "seconds": round(seconds, 4), "peak_rss_mb": peak_rss_mb()}
+        with self._lock:
+            self.records.append(entry)
+            if self._file:
+                try: self._file.write(json.dumps(entry, default=str) + "\n"); self._file.flush()
+                except (OSError, ValueError) as e: logging.warning(f"Could not write metrics record: {e}")
+        return entry
+
+    def summary_rows(self):
+        """Aggregates records per stage, in first-seen order."""
+        rows = {}
+        for rec in self.records:
+            row = rows.setdefault(rec["stage"], {"stage": rec["stage"], "count": 0, "total_s": 0.0, "max_s": 0.0,
+                                                 "bytes": 0, "chars": 0, "tokens": 0, "peak_rss_mb": None})
+            row["count"] += 1
+            row["total_s"] += rec["seconds"]
+            row["max_s"] = max(row["max_s"], rec["seconds"])
+            for key in ("bytes", "chars", "tokens"):
+                if isinstance(rec.get(key), (int, float)): row[key] += rec[key]
+            if rec.get("peak_rss_mb") is not None:
+                row["peak_rss_mb"] = max(row["peak_rss_mb"] or 0, rec["peak_rss_mb"])
+        return list(rows.values())
+
+    def log_summary(self):
+        """Logs a per-stage summary table of the run."""
+        rows = self.summary_rows()
+        if not rows: logging.info("Run metrics: no spans recorded."); return
+        logging.info(f"Run metrics summary ({self.run_id}):")
+        logging.info(f"  {'stage':<14}{'count':>6}{'total s':>10}{'mean s':>9}{'max s':>9}{'bytes':>11}{'chars':>10}{'tokens':>8}{'rss MB':>8}")
+        for r in rows:
+            rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+            logging.info(f"  {r['stage']:<14}{r['count']:>6}{r['total_s']:>10.2f}{r['total_s'] / r['count']:>9.3f}"
+                         f"{r['max_s']:>9.3f}{r['bytes']:>11}{r['chars']:>10}{r['tokens']:>8}{rss:>8}")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                try: self._file.close()
+                finally: self._file = None
+
+
+# --- Module-level recorder for the current run ---
+_current = None
+
+def start_run(run_id, metrics_dir="./metrics"):
+    """Starts collecting metrics for a run. Returns the RunMetrics instance."""
+    global _current
+    if _current: end_run(log_summary=False)
+    _current = RunMetrics(run_id, metrics_dir)
+    return _current
+
+def end_run(log_summary=True):
+    """Logs the summary table (optional) and closes the metrics file."""
+    global _current
+    if not _current: return None
+    run = _current
+    _current = None
+    if log_summary: run.log_summary()
+    run.close()
+    return run
+
+def current():
+    return _current
+
+def set_context(**fields):
+    if _current: _current.set_context(**fields)
+
+@contextmanager
+def span(stage, **counts):
+    if _current:
+        with _current.span(stage, **counts) as record:
+            yield record
+    else:
+        yield {} # Not recording: still give callers a dict to write counts into
+
+def record(stage, seconds, **counts):
+    if _current: return _current.record(stage, seconds, **counts)
+    return None